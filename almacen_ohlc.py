@@ -0,0 +1,148 @@
+import glob
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from parseo_ohlc import COLUMNAS, dataframe_ohlc, inicios_tramos, parsear_ohlc, solo_lectura
+
+# Directorio donde se guardan las velas descargadas (un fichero por par e intervalo)
+DIRECTORIO_DATOS = os.environ.get('KRAKEN_DATOS', 'datos_kraken')
+
+# Segundos durante los que se sirve lo guardado sin volver a preguntar a Kraken
+REFRESCO_MINIMO = 10
+
+logger = logging.getLogger('kraken.almacen')
+
+
+# Unir las velas guardadas con las nuevas; las nuevas sustituyen a las de igual o mayor tiempo.
+# Kraken sólo devuelve las 720 velas más recientes sea cual sea 'since': si lo guardado es más antiguo
+# las nuevas empiezan después de un hueco. Se conserva todo (puede ser un histórico reconstruido) y el
+# hueco queda a la vista en los tiempos: ver AlmacenOHLC.huecos y parseo_ohlc.inicios_tramos
+def fusionar_columnas(guardadas, nuevas, intervalo=None):
+    if guardadas is None or len(guardadas['time']) == 0:
+        return nuevas
+    if len(nuevas['time']) == 0:
+        return guardadas
+    if intervalo is not None and nuevas['time'][0] > guardadas['time'][-1] + intervalo * 60:
+        logger.warning("Hueco de %d velas de %d min entre lo guardado y lo descargado; se puede rellenar con "
+                       "backfill_trades.py --desde/--hasta",
+                       (nuevas['time'][0] - guardadas['time'][-1]) // (intervalo * 60) - 1, intervalo)
+    corte = np.searchsorted(guardadas['time'], nuevas['time'][0], side='left')
+    return {nombre: np.concatenate([guardadas[nombre][:corte], nuevas[nombre]]) for nombre in COLUMNAS}
+
+
+# Añadir velas históricas (p. ej. reconstruidas a partir de trades); donde ya hay vela se conserva la guardada
+def fusionar_historico(guardadas, historicas):
+    if guardadas is None or len(guardadas['time']) == 0:
+        return historicas
+    nuevas = ~np.isin(historicas['time'], guardadas['time'])
+    tiempos = np.concatenate([guardadas['time'], historicas['time'][nuevas]])
+    orden = np.argsort(tiempos, kind='stable')
+    return {nombre: np.concatenate([guardadas[nombre], historicas[nombre][nuevas]])[orden] for nombre in COLUMNAS}
+
+
+# Almacén local de velas OHLC por (par, intervalo) con refresco incremental usando 'since'
+class AlmacenOHLC:
+    def __init__(self, directorio=DIRECTORIO_DATOS, refresco_minimo=REFRESCO_MINIMO):
+        self.directorio = directorio
+        self.refresco_minimo = refresco_minimo
+        self._cerrojo = threading.Lock()
+        self._cerrojos = {}
+        self._memoria = {}
+
+    def ruta(self, par, intervalo):
+        nombre = re.sub(r'[^A-Za-z0-9._-]', '_', par)
+        return os.path.join(self.directorio, f"{nombre}_{intervalo}.npz")
+
+    # Intervalos guardados de un par y los segundos de historia que cubre cada uno
+    def coberturas(self, par):
+        prefijo = self.ruta(par, '')[:-len('.npz')]
+        resultado = {}
+        for ruta in glob.glob(glob.escape(prefijo) + '*.npz'):
+            sufijo = ruta[len(prefijo):-len('.npz')]
+            if sufijo.isdigit():
+                columnas, _, _ = self.cargar(par, int(sufijo))
+                if columnas is not None and len(columnas['time']):
+                    resultado[int(sufijo)] = int(columnas['time'][-1] - columnas['time'][0])
+        return resultado
+
+    # Leer las velas guardadas; devuelve (columnas, last, actualizado) o (None, None, 0)
+    def cargar(self, par, intervalo):
+        clave = (par, intervalo)
+        ruta = self.ruta(par, intervalo)
+        try:
+            mtime = os.path.getmtime(ruta)
+        except OSError:
+            return None, None, 0
+        en_memoria = self._memoria.get(clave)
+        if en_memoria is not None and en_memoria[3] == mtime:
+            return en_memoria[:3]
+        with np.load(ruta) as datos:
+            columnas = solo_lectura({nombre: datos[nombre] for nombre in COLUMNAS})
+            last = int(datos['last'])
+            actualizado = float(datos['actualizado'])
+        self._memoria[clave] = (columnas, last, actualizado, mtime)
+        return columnas, last, actualizado
+
+    # Huecos de lo guardado como pares (última vela antes, primera vela después), en época
+    def huecos(self, par, intervalo):
+        columnas, _, _ = self.cargar(par, intervalo)
+        if columnas is None:
+            return []
+        tiempos = columnas['time']
+        return [(int(tiempos[i - 1]), int(tiempos[i])) for i in inicios_tramos(tiempos, intervalo)[1:]]
+
+    # Guardar de forma atómica para que otro proceso nunca lea un fichero a medias
+    def guardar(self, par, intervalo, columnas, last, actualizado=None):
+        if actualizado is None:
+            actualizado = time.time()
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self.ruta(par, intervalo)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            np.savez(f, last=np.int64(last), actualizado=np.float64(actualizado), **columnas)
+        os.replace(temporal, ruta)
+        self._memoria[(par, intervalo)] = (solo_lectura(columnas), last, actualizado, os.path.getmtime(ruta))
+
+    # Un cerrojo por (par, intervalo) para poder actualizar varios pares a la vez
+    def cerrojo(self, par, intervalo):
+        with self._cerrojo:
+            return self._cerrojos.setdefault((par, intervalo), threading.Lock())
+
+    # Pedir a Kraken sólo las velas posteriores al cursor 'last' y añadirlas a lo guardado
+    def actualizar(self, api, par, intervalo=60):
+        with self.cerrojo(par, intervalo):
+            columnas, last, actualizado = self.cargar(par, intervalo)
+            if columnas is not None and time.time() - actualizado < self.refresco_minimo:
+                return columnas
+
+            parametros = {'pair': par, 'interval': intervalo}
+            if last is not None:
+                parametros['since'] = last
+            resp = api.query_public('OHLC', parametros)
+            if resp.get('error'):
+                raise RuntimeError(', '.join(resp['error']))
+            resultado = resp['result']
+            filas = resultado[par] if par in resultado else next(v for k, v in resultado.items() if k != 'last')
+
+            columnas = fusionar_columnas(columnas, parsear_ohlc(filas), intervalo)
+            self.guardar(par, intervalo, columnas, resultado.get('last', last or 0))
+            return columnas
+
+    # Insertar velas antiguas sin tocar el cursor 'last' ni la hora del último refresco
+    def insertar_historico(self, par, intervalo, columnas):
+        with self.cerrojo(par, intervalo):
+            guardadas, last, actualizado = self.cargar(par, intervalo)
+            self.guardar(par, intervalo, fusionar_historico(guardadas, columnas), last or 0, actualizado)
+
+    # Devolver las velas como DataFrame tipado (float64 o, si se pide, float32) que comparte memoria con el almacén
+    def dataframe(self, columnas, dtype=None, nombres=None):
+        return dataframe_ohlc(columnas, dtype, nombres)
+
+
+# Almacén compartido por todas las sesiones del proceso
+almacen = AlmacenOHLC()
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import time
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from almacen_ohlc import almacen
+from parseo_ohlc import COLUMNAS
+from planificador_kraken import PRIORIDAD_BAJA, ApiPlanificada, planificador
+
+# Reconstruir velas de cualquier intervalo a partir del endpoint Trades de Kraken, más allá
+# del límite de 720 velas de OHLC. Se pagina con el cursor 'since', se agrega sobre la marcha
+# y el progreso se guarda junto al almacén para poder continuar tras una interrupción.
+
+# Páginas de trades que se agregan antes de volcar las velas cerradas al almacén
+PAGINAS_POR_VOLCADO = 50
+
+
+# Convertir una página de trades [precio, volumen, tiempo, ...] en columnas NumPy
+def parsear_trades(filas):
+    n = len(filas)
+    return (np.fromiter(map(itemgetter(0), filas), np.float64, count=n),
+            np.fromiter(map(itemgetter(1), filas), np.float64, count=n),
+            np.fromiter(map(itemgetter(2), filas), np.float64, count=n))
+
+
+# Agregación incremental de trades en velas; la última vela queda abierta hasta ver un trade posterior
+class AgregadorVelas:
+    def __init__(self, intervalo=60, abierta=None):
+        self.segundos = intervalo * 60
+        # Vela abierta: [inicio, open, high, low, close, suma precio*volumen, volume, count]
+        self.abierta = abierta
+
+    def agregar(self, precios, volumenes, tiempos):
+        if len(precios) == 0:
+            return None
+        inicios = (tiempos // self.segundos).astype(np.int64) * self.segundos
+        cortes = np.flatnonzero(np.diff(inicios)) + 1
+        primeros = np.concatenate([[0], cortes])
+        ultimos = np.append(cortes, len(precios)) - 1
+        velas = {
+            'time': inicios[primeros],
+            'open': precios[primeros],
+            'high': np.maximum.reduceat(precios, primeros),
+            'low': np.minimum.reduceat(precios, primeros),
+            'close': precios[ultimos],
+            'pv': np.add.reduceat(precios * volumenes, primeros),
+            'volume': np.add.reduceat(volumenes, primeros),
+            'count': np.diff(np.append(primeros, len(precios))),
+        }
+
+        # La vela abierta de la página anterior continúa si coincide con la primera de ésta
+        if self.abierta is not None:
+            inicio, apertura, alto, bajo, _, pv, volumen, cuenta = self.abierta
+            if velas['time'][0] == inicio:
+                velas['open'][0] = apertura
+                velas['high'][0] = max(alto, velas['high'][0])
+                velas['low'][0] = min(bajo, velas['low'][0])
+                velas['pv'][0] += pv
+                velas['volume'][0] += volumen
+                velas['count'][0] += cuenta
+            else:
+                velas = {nombre: np.concatenate([[valor], velas[nombre]]) for nombre, valor in
+                         zip(['time', 'open', 'high', 'low', 'close', 'pv', 'volume', 'count'], self.abierta)}
+
+        self.abierta = [velas[nombre][-1].item() for nombre in ['time', 'open', 'high', 'low', 'close', 'pv', 'volume', 'count']]
+        return self._columnas({nombre: valores[:-1] for nombre, valores in velas.items()})
+
+    # Cerrar la vela abierta (al llegar al final del rango pedido)
+    def cerrar(self):
+        if self.abierta is None:
+            return None
+        velas = {nombre: np.array([valor]) for nombre, valor in
+                 zip(['time', 'open', 'high', 'low', 'close', 'pv', 'volume', 'count'], self.abierta)}
+        self.abierta = None
+        return self._columnas(velas)
+
+    def _columnas(self, velas):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.where(velas['volume'] > 0, velas['pv'] / velas['volume'], velas['close'])
+        return {
+            'time': velas['time'].astype(np.int64), 'open': velas['open'].astype(np.float64),
+            'high': velas['high'].astype(np.float64), 'low': velas['low'].astype(np.float64),
+            'close': velas['close'].astype(np.float64), 'vwap': vwap.astype(np.float64),
+            'volume': velas['volume'].astype(np.float64), 'count': velas['count'].astype(np.int64),
+        }
+
+
+def _concatenar(bloques):
+    return {nombre: np.concatenate([bloque[nombre] for bloque in bloques]) for nombre in COLUMNAS}
+
+
+class Backfill:
+    def __init__(self, api, par, intervalo=60, almacen=almacen):
+        # Con ApiPlanificada el límite de tasa lo aplica el planificador compartido
+        self.api = api
+        self.par = par
+        self.intervalo = intervalo
+        self.almacen = almacen
+        self.ruta_progreso = almacen.ruta(par, intervalo).replace('.npz', '.backfill.json')
+
+    def cargar_progreso(self):
+        try:
+            with open(self.ruta_progreso) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def guardar_progreso(self, since, abierta, hasta):
+        os.makedirs(os.path.dirname(self.ruta_progreso) or '.', exist_ok=True)
+        temporal = f"{self.ruta_progreso}.tmp"
+        with open(temporal, 'w') as f:
+            json.dump({'since': since, 'abierta': abierta, 'hasta': hasta}, f)
+        os.replace(temporal, self.ruta_progreso)
+
+    def _pagina(self, since):
+        resp = self.api.query_public('Trades', {'pair': self.par, 'since': since})
+        if resp.get('error'):
+            raise RuntimeError(', '.join(resp['error']))
+        resultado = resp['result']
+        filas = resultado[self.par] if self.par in resultado else next(v for k, v in resultado.items() if k != 'last')
+        return filas, str(resultado['last'])
+
+    # Descargar y agregar trades desde 'desde' (segundos) hasta 'hasta'; continúa donde lo dejó si hay progreso
+    def ejecutar(self, desde=None, hasta=None, informar=None):
+        progreso = self.cargar_progreso()
+        if progreso is not None:
+            since, hasta = progreso['since'], progreso['hasta']
+            agregador = AgregadorVelas(self.intervalo, progreso['abierta'])
+        else:
+            since = str(int((desde or 0) * 1e9))
+            hasta = hasta or time.time()
+            agregador = AgregadorVelas(self.intervalo)
+
+        bloques, paginas, total = [], 0, 0
+        terminado = False
+        while not terminado:
+            filas, siguiente = self._pagina(since)
+            if filas:
+                precios, volumenes, tiempos = parsear_trades(filas)
+                dentro = tiempos < hasta
+                terminado = not dentro.all()
+                velas = agregador.agregar(precios[dentro], volumenes[dentro], tiempos[dentro])
+                if velas is not None and len(velas['time']):
+                    bloques.append(velas)
+                total += int(dentro.sum())
+            terminado = terminado or not filas or siguiente == since
+            since = siguiente
+            paginas += 1
+
+            # Volcado periódico: la memoria no crece con la cantidad de trades procesados
+            if terminado or paginas % PAGINAS_POR_VOLCADO == 0:
+                # La vela abierta sólo se cierra si su intervalo termina antes de 'hasta'
+                abierta = agregador.abierta
+                if terminado and abierta is not None and abierta[0] + agregador.segundos <= hasta:
+                    cerrada = agregador.cerrar()
+                    if cerrada is not None:
+                        bloques.append(cerrada)
+                if bloques:
+                    self.almacen.insertar_historico(self.par, self.intervalo, _concatenar(bloques))
+                    bloques = []
+                self.guardar_progreso(since, agregador.abierta, hasta)
+                if informar is not None:
+                    informar(paginas, total, since)
+
+        if os.path.exists(self.ruta_progreso):
+            os.remove(self.ruta_progreso)
+        return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruir velas históricas a partir de los trades de Kraken.")
+    parser.add_argument('par', help="par tal como aparece en AssetPairs, p. ej. XXBTZEUR")
+    parser.add_argument('--intervalo', type=int, default=60, help="minutos por vela")
+    parser.add_argument('--desde', default=None, help="fecha de inicio (YYYY-MM-DD); se ignora al continuar")
+    parser.add_argument('--hasta', default=None, help="fecha de fin (por defecto, ahora)")
+    parser.add_argument('--uri', default=None, help="URL alternativa de la API (p. ej. el servidor mock)")
+    args = parser.parse_args()
+
+    if args.uri:
+        planificador.uri = args.uri
+    # Prioridad baja: un backfill largo no debe retrasar las peticiones de la interfaz
+    api = ApiPlanificada(PRIORIDAD_BAJA)
+    desde = pd.Timestamp(args.desde).timestamp() if args.desde else None
+    hasta = pd.Timestamp(args.hasta).timestamp() if args.hasta else None
+    backfill = Backfill(api, args.par, args.intervalo)
+    total = backfill.ejecutar(desde, hasta, informar=lambda paginas, trades, since: print(
+        f"{paginas} páginas, {trades} trades, hasta {pd.Timestamp(int(since), unit='ns')}"))
+    print(f"Backfill terminado: {total} trades agregados en velas de {args.intervalo} minutos")
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# Comisión por operación de Kraken (taker) expresada como fracción
+COMISION_KRAKEN = 0.0026
+
+
+# Resultado de un backtest: todas las series tienen forma (pares, velas)
+class ResultadoBacktest:
+    def __init__(self, cierres, posiciones, rentabilidades, equity, drawdown, comisiones, pares=None):
+        self.cierres = cierres
+        self.posiciones = posiciones
+        self.rentabilidades = rentabilidades
+        self.equity = equity
+        self.drawdown = drawdown
+        self.comisiones = comisiones
+        self.pares = pares if pares is not None else list(range(len(cierres)))
+
+    # Operaciones de un par: velas donde cambia la posición, con precio y nueva posición
+    def operaciones(self, i=0):
+        cambios = np.flatnonzero(np.diff(self.posiciones[i], prepend=0))
+        return pd.DataFrame({
+            'vela': cambios,
+            'precio': self.cierres[i, cambios],
+            'posicion': self.posiciones[i, cambios],
+        })
+
+    # Tabla con el resultado final de cada par
+    def resumen(self):
+        cambios = np.abs(np.diff(self.posiciones, axis=1, prepend=0))
+        return pd.DataFrame({
+            'par': self.pares,
+            'rentabilidad': self.equity[:, -1] - 1,
+            'max_drawdown': self.drawdown.min(axis=1),
+            'operaciones': (cambios > 0).sum(axis=1),
+            'comisiones': self.comisiones.sum(axis=1),
+        })
+
+
+# Convertir señales 1/-1/0 en posiciones mantenidas hasta la siguiente señal contraria
+def senales_a_posiciones(senales, permitir_cortos=False):
+    senales = np.atleast_2d(senales)
+    objetivo = np.where(senales == 1, 1, np.where(senales == -1, -1 if permitir_cortos else 0, 0)).astype(np.int8)
+    indices = np.where(senales != 0, np.arange(senales.shape[1]), -1)
+    indices = np.maximum.accumulate(indices, axis=1)
+    posiciones = np.take_along_axis(objetivo, np.maximum(indices, 0), axis=1)
+    posiciones[indices < 0] = 0
+    return posiciones
+
+
+# Backtest vectorizado: sin bucles por vela, admite un par (1D) o muchos a la vez (2D)
+def backtest(cierres, senales, comision=COMISION_KRAKEN, permitir_cortos=False, pares=None):
+    cierres = np.atleast_2d(np.asarray(cierres, dtype=np.float64))
+    posiciones = senales_a_posiciones(np.asarray(senales), permitir_cortos)
+
+    # La posición decidida al cierre de una vela se aplica a la rentabilidad de la siguiente
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rent_mercado = np.diff(cierres, axis=1, prepend=np.nan) / np.roll(cierres, 1, axis=1)
+    rent_mercado = np.nan_to_num(rent_mercado, nan=0.0, posinf=0.0, neginf=0.0)
+    rent_mercado[:, 0] = 0.0
+    posicion_previa = np.concatenate([np.zeros((len(posiciones), 1), dtype=np.int8), posiciones[:, :-1]], axis=1)
+
+    comisiones = comision * np.abs(np.diff(posiciones, axis=1, prepend=0))
+    rentabilidades = posicion_previa * rent_mercado - comisiones
+    equity = np.cumprod(1 + rentabilidades, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+    return ResultadoBacktest(cierres, posiciones, rentabilidades, equity, drawdown, comisiones, pares)
+
+
+# Atajo para el DataFrame que devuelve calcular_senales
+def backtest_dataframe(df_bollinger, comision=COMISION_KRAKEN, permitir_cortos=False):
+    return backtest(df_bollinger['close'].to_numpy(), df_bollinger['signal'].to_numpy(), comision, permitir_cortos)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+# Resultado compacto del barrido: media y desviación por ventana y z-score del cierre.
+# Las bandas y las señales de cada (ventana, num_sd) se derivan sin copiar DataFrames.
+class ResultadoBarrido:
+    def __init__(self, cierres, ventanas, num_sds, media, desviacion):
+        self.cierres = cierres
+        self.ventanas = ventanas
+        self.num_sds = num_sds
+        self.media = media
+        self.desviacion = desviacion
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.z = (cierres - media) / desviacion
+
+    def _indice(self, ventana):
+        return int(np.flatnonzero(self.ventanas == ventana)[0])
+
+    # Bandas superior e inferior de una combinación concreta
+    def bandas(self, ventana, num_sd):
+        i = self._indice(ventana)
+        return self.media[i] + self.desviacion[i] * num_sd, self.media[i] - self.desviacion[i] * num_sd
+
+    # Cubo de señales (ventanas x num_sds x velas) con 1 compra, -1 venta y 0 nada
+    def senales(self):
+        z = self.z[:, None, :]
+        umbral = self.num_sds[None, :, None]
+        return (z < -umbral).astype(np.int8) - (z > umbral).astype(np.int8)
+
+    # Número de señales de compra y venta por combinación, sin construir el cubo
+    def resumen(self):
+        filas = []
+        for i, ventana in enumerate(self.ventanas):
+            z = np.sort(self.z[i][~np.isnan(self.z[i])])
+            compras = np.searchsorted(z, -self.num_sds, side='left')
+            ventas = len(z) - np.searchsorted(z, self.num_sds, side='right')
+            for num_sd, compra, venta in zip(self.num_sds, compras, ventas):
+                filas.append((ventana, num_sd, compra, venta))
+        return pd.DataFrame(filas, columns=['ventana', 'num_sd', 'compras', 'ventas'])
+
+
+# Velas por bloque en las sumas acumuladas del barrido
+BLOQUE = 4096
+
+
+# Media y desviación (muestral) de una ventana móvil con sumas acumuladas re-ancladas por bloques: cada
+# bloque se centra en su propia media y acumula desde cero, así el error de redondeo de la suma de
+# cuadrados depende de la dispersión local y no de toda la serie (una suma global se cancela en s2 - s²/w)
+def _momentos(cierres, w, media, desviacion):
+    for inicio in range(w - 1, len(cierres), BLOQUE):
+        tramo = cierres[inicio - w + 1:inicio + BLOQUE]
+        centro = tramo.mean()
+        centrados = tramo - centro
+        suma = np.concatenate([[0.0], np.cumsum(centrados)])
+        suma2 = np.concatenate([[0.0], np.cumsum(centrados * centrados)])
+        s = suma[w:] - suma[:-w]
+        s2 = suma2[w:] - suma2[:-w]
+        fin = inicio + len(s)
+        media[inicio:fin] = s / w + centro
+        desviacion[inicio:fin] = np.sqrt(np.maximum((s2 - s * s / w) / (w - 1), 0.0))
+
+
+# Calcular las Bandas de Bollinger para toda una rejilla de ventanas y multiplicadores en una pasada
+def barrido_bollinger(df, ventanas, num_sds):
+    cierres = np.asarray(df['close'] if isinstance(df, pd.DataFrame) else df, dtype=np.float64)
+    ventanas = np.asarray(ventanas, dtype=np.int64)
+    num_sds = np.asarray(num_sds, dtype=np.float64)
+    n = len(cierres)
+
+    media = np.full((len(ventanas), n), np.nan)
+    desviacion = np.full((len(ventanas), n), np.nan)
+    for i, w in enumerate(ventanas):
+        if 2 <= w <= n:
+            _momentos(cierres, w, media[i], desviacion[i])
+    return ResultadoBarrido(cierres, ventanas, num_sds, media, desviacion)
@@ -0,0 +1,129 @@
+import argparse
+import gc
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+
+from cliente_kraken import api_del_hilo
+from eventos_senales import IndiceEventos
+from final2 import KrakenApp
+from nucleo_kraken import ARRANQUE_OBJETIVO
+from parseo_ohlc import dataframe_ohlc, parsear_dataframe
+from servidor_mock_kraken import EstadoMock, _fila_ohlc, iniciar_en_hilo
+from servidor_replay import velas_sinteticas
+
+# Benchmark de la cadena descarga -> DataFrame -> Bollinger -> señales -> gráficos contra el servidor mock.
+# Con --guardar se escribe la referencia; sin él se compara con ella y se sale con código 1 si algo empeora.
+# La referencia depende de la máquina y no se versiona: sin ella se sale con código 2 para que nunca
+# pase en silencio (en una máquina nueva, primero --guardar).
+
+TAMANOS = [720, 10_000, 100_000, 1_000_000]
+TAMANO_COMPLETO = 10_000_000
+# Directorio del repositorio: el subproceso de arranque importa los módulos desde aquí
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+REFERENCIA = os.path.join(DIRECTORIO, 'benchmark_referencia.json')
+
+# Un tiempo empeora si supera la referencia por este factor y por más del umbral absoluto (ruido)
+TOLERANCIA = 1.5
+UMBRAL_RUIDO = 0.002
+
+
+# Mejor tiempo de varias repeticiones (el mínimo es el menos afectado por el ruido)
+def medir(funcion, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def medir_descarga(repeticiones):
+    servidor, url = iniciar_en_hilo(EstadoMock())
+    try:
+        # Cliente compartido de la aplicación: conexión keep-alive y gzip como en producción
+        api = api_del_hilo()
+        api.uri = url
+        return medir(lambda: api.query_public('OHLC', {'pair': 'XXBTZEUR', 'interval': 60}), repeticiones)
+    finally:
+        servidor.shutdown()
+
+
+# Arranque en frío del núcleo sin interfaz: un intérprete nuevo que sólo lo importa
+def medir_arranque(repeticiones):
+    return medir(lambda: subprocess.run([sys.executable, '-c', 'import nucleo_kraken'], check=True, cwd=DIRECTORIO), repeticiones)
+
+
+def medir_tamano(app, n, repeticiones):
+    columnas = velas_sinteticas(n=n)
+    filas = [_fila_ohlc(columnas, i) for i in range(n)]
+    resultados = {'parseo': medir(lambda: parsear_dataframe(filas), repeticiones)}
+    del filas
+    df = dataframe_ohlc(columnas)
+
+    resultados['bollinger'] = medir(lambda: app.calcular_bandas_bollinger(df), repeticiones)
+    df_bollinger = app.calcular_bandas_bollinger(df)
+    resultados['senales'] = medir(lambda: app.calcular_senales(df_bollinger), repeticiones)
+    eventos = IndiceEventos.desde_dataframe(app.calcular_senales(df_bollinger))
+
+    # Se mide la construcción real de la figura, sin pasar por la caché
+    resultados['graficar_datos'] = medir(lambda: inspect.unwrap(KrakenApp.graficar_datos)(app, df, 'BENCH'), repeticiones)
+    resultados['graficar_bandas'] = medir(lambda: inspect.unwrap(KrakenApp.graficar_bandas_bollinger)(app, df_bollinger, 'BENCH'), repeticiones)
+    resultados['graficar_senales'] = medir(lambda: inspect.unwrap(KrakenApp.graficar_senales)(app, df_bollinger, 'BENCH', eventos), repeticiones)
+    resultados['graficar_velas'] = medir(lambda: inspect.unwrap(KrakenApp.graficar_velas)(app, df, 'BENCH'), repeticiones)
+    return resultados
+
+
+def ejecutar(tamanos, repeticiones):
+    app = KrakenApp()
+    resultados = {'arranque_nucleo': medir_arranque(repeticiones), 'descarga@720': medir_descarga(repeticiones)}
+    for n in tamanos:
+        for etapa, segundos in medir_tamano(app, n, repeticiones).items():
+            resultados[f"{etapa}@{n}"] = segundos
+    return resultados
+
+
+def comparar(resultados, referencia, tolerancia=TOLERANCIA):
+    regresiones = []
+    for clave, segundos in resultados.items():
+        anterior = referencia.get(clave)
+        if anterior is not None and segundos > anterior * tolerancia and segundos - anterior > UMBRAL_RUIDO:
+            regresiones.append((clave, anterior, segundos))
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la cadena de análisis de Kraken.")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS, help="número de velas a medir")
+    parser.add_argument('--completo', action='store_true', help=f"añadir {TAMANO_COMPLETO:,} velas")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--referencia', default=REFERENCIA)
+    parser.add_argument('--guardar', action='store_true', help="guardar los tiempos como nueva referencia")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    tamanos = args.tamanos + ([TAMANO_COMPLETO] if args.completo else [])
+    resultados = ejecutar(tamanos, args.repeticiones)
+    for clave, segundos in resultados.items():
+        print(f"{clave:<28} {segundos * 1000:10.2f} ms")
+    if resultados['arranque_nucleo'] > ARRANQUE_OBJETIVO:
+        print(f"AVISO: el arranque del núcleo supera el objetivo de {ARRANQUE_OBJETIVO * 1000:.0f} ms")
+
+    if args.guardar:
+        with open(args.referencia, 'w') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Referencia guardada en {args.referencia}")
+    elif os.path.exists(args.referencia):
+        with open(args.referencia) as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        for clave, anterior, segundos in regresiones:
+            print(f"REGRESIÓN {clave}: {anterior * 1000:.2f} ms -> {segundos * 1000:.2f} ms")
+        sys.exit(1 if regresiones else 0)
+    else:
+        print(f"ERROR: no hay referencia en {args.referencia}; no se ha comprobado ninguna regresión. "
+              f"Guárdala primero con --guardar en esta máquina.", file=sys.stderr)
+        sys.exit(2)
@@ -1,13 +1,14 @@
 import streamlit as st
-import krakenex
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from PIL import Image
 from matplotlib.ticker import MaxNLocator
+from catalogo_pares import catalogo
+from planificador_kraken import PRIORIDAD_ALTA, ApiPlanificada
 
 # Configurar la API de Kraken
-api = krakenex.API()
+api = ApiPlanificada(PRIORIDAD_ALTA)
 
 # Función para obtener datos OHLC
 def get_ohlc_data(pair, interval=60):
@@ -94,8 +95,7 @@ st.title("Visualización del Par de Monedas en Kraken")
 
 # Obtener todos los pares de criptomonedas
 try:
-    resp_pairs = api.query_public('AssetPairs')
-    all_pairs = list(resp_pairs['result'].keys())
+    all_pairs = catalogo.nombres()
 except Exception as e:
     st.error(f"Error al obtener los pares de monedas: {e}")
     all_pairs = []
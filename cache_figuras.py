@@ -0,0 +1,79 @@
+import functools
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+# Memoria máxima (bytes de JSON) que puede ocupar la caché de figuras en todo el proceso
+BYTES_MAXIMOS = 64 * 1024 * 1024
+
+
+# Versión barata de los datos: cambia cuando llegan velas nuevas o se actualiza la última
+def version_datos(df):
+    if len(df) == 0:
+        return (0,)
+    return (len(df), df['time'].iloc[0], int(pd.util.hash_pandas_object(df.iloc[-1:]).iloc[0]))
+
+
+# LRU de figuras serializadas con límite de memoria en bytes
+class CacheFiguras:
+    def __init__(self, bytes_maximos=BYTES_MAXIMOS):
+        self.bytes_maximos = bytes_maximos
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._figuras = OrderedDict()
+        self._cerrojo = threading.Lock()
+
+    def obtener(self, clave):
+        with self._cerrojo:
+            serializada = self._figuras.get(clave)
+            if serializada is None:
+                self.fallos += 1
+                return None
+            self._figuras.move_to_end(clave)
+            self.aciertos += 1
+        return pio.from_json(serializada)
+
+    def guardar(self, clave, fig):
+        serializada = fig.to_json()
+        tamano = len(serializada)
+        if tamano > self.bytes_maximos:
+            return
+        with self._cerrojo:
+            anterior = self._figuras.pop(clave, None)
+            if anterior is not None:
+                self.bytes -= len(anterior)
+            self._figuras[clave] = serializada
+            self.bytes += tamano
+            while self.bytes > self.bytes_maximos:
+                _, expulsada = self._figuras.popitem(last=False)
+                self.bytes -= len(expulsada)
+
+    def vaciar(self):
+        with self._cerrojo:
+            self._figuras.clear()
+            self.bytes = 0
+
+
+# Caché compartida por todas las sesiones
+cache = CacheFiguras()
+
+
+# Decorador para los métodos graficar_*(self, df, par_seleccionado, ...): la clave incluye el método
+# (módulo y nombre cualificado: dos aplicaciones pueden tener un graficar_* con el mismo nombre que
+# dibuja otra cosa), el par, la versión de los datos y los parámetros de visualización de la instancia. Los argumentos extra
+# (p. ej. el índice de eventos) deben derivarse de 'df', porque no forman parte de la clave
+def memorizar_figura(metodo):
+    @functools.wraps(metodo)
+    def envoltura(self, df, par_seleccionado, *args):
+        clave = (metodo.__module__, metodo.__qualname__, par_seleccionado, version_datos(df),
+                 getattr(self, 'rango', None), getattr(self, 'puntos_maximos', None))
+        fig = cache.obtener(clave)
+        if fig is None:
+            fig = metodo(self, df, par_seleccionado, *args)
+            if fig is not None:
+                cache.guardar(clave, fig)
+        return fig
+    return envoltura
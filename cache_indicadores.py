@@ -0,0 +1,99 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from almacen_ohlc import almacen
+from motor_indicadores import calcular
+from parseo_ohlc import solo_lectura
+
+# Bandas de Bollinger y señales guardadas junto a las velas de cada (par, intervalo), una por juego de
+# parámetros. Al llegar velas nuevas sólo se recalcula la cola que depende de ellas: las ventana-1 velas
+# de calentamiento anteriores más las nuevas. La última vela guardada se recalcula también si su cierre
+# ha cambiado (era la vela todavía abierta).
+
+COLUMNAS_INDICADORES = ['media_móvil', 'desviación_estándar', 'banda_superior', 'banda_inferior']
+
+
+# Bandas y señal (0 donde aún no hay bandas) de un tramo de cierres; las primeras 'calentamiento'
+# filas sólo sirven para llenar la ventana y no se devuelven. Con los tiempos, las ventanas no cruzan huecos
+def _calcular_tramo(tiempos, cierres, ventana, num_sd, calentamiento=0):
+    bandas = {nombre: valores[calentamiento:] for nombre, valores in
+              calcular({'time': tiempos, 'close': cierres}, {'bollinger': {'ventana': ventana, 'num_sd': num_sd}}).items()}
+    cierres = cierres[calentamiento:]
+    bandas['signal'] = np.where(cierres < bandas['banda_inferior'], 1,
+                                np.where(cierres > bandas['banda_superior'], -1, 0)).astype(np.int8)
+    return bandas
+
+
+class CacheIndicadores:
+    def __init__(self, almacen=almacen):
+        self.almacen = almacen
+        self._memoria = {}
+        self._cerrojo = threading.Lock()
+        # Filas recalculadas en la última llamada de esta instancia. En la instancia compartida entre
+        # sesiones sólo es orientativo (otra sesión puede sobrescribirlo); las pruebas usan la suya propia
+        self.ultimas_recalculadas = 0
+
+    def ruta(self, par, intervalo, ventana, num_sd):
+        return self.almacen.ruta(par, intervalo).replace('.npz', f'.bollinger_{ventana}_{num_sd:g}.npz')
+
+    def cargar(self, ruta):
+        try:
+            mtime = os.path.getmtime(ruta)
+        except OSError:
+            return None
+        en_memoria = self._memoria.get(ruta)
+        if en_memoria is not None and en_memoria[1] == mtime:
+            return en_memoria[0]
+        with np.load(ruta) as datos:
+            guardado = solo_lectura({nombre: datos[nombre] for nombre in datos.files})
+        self._memoria[ruta] = (guardado, mtime)
+        return guardado
+
+    def guardar(self, ruta, guardado):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            np.savez(f, **guardado)
+        os.replace(temporal, ruta)
+        self._memoria[ruta] = (solo_lectura(guardado), os.path.getmtime(ruta))
+
+    # Primera fila que hay que recalcular: 0 si lo guardado no corresponde a estas velas
+    def _corte(self, guardado, tiempos, cierres):
+        if guardado is None or len(guardado['time']) == 0 or len(guardado['time']) > len(tiempos):
+            return 0
+        n = len(guardado['time'])
+        # Las velas cerradas no cambian; si cambian los tiempos (p. ej. un backfill por delante) se recalcula todo
+        if not np.array_equal(guardado['time'], tiempos[:n]):
+            return 0
+        return n if guardado['ultimo_cierre'] == cierres[n - 1] else n - 1
+
+    # DataFrame con 'time', 'close', las bandas y 'signal' para el DataFrame de precios 'df' de (par, intervalo)
+    def bandas(self, par, intervalo, df, ventana=20, num_sd=2):
+        tiempos = df.index.to_numpy() if df.index.name == 'epoch' else df['time'].to_numpy().astype('datetime64[s]').view(np.int64)
+        cierres = df['close'].to_numpy()
+        ruta = self.ruta(par, intervalo, ventana, num_sd)
+        with self.almacen.cerrojo(par, f'bollinger_{intervalo}_{ventana}_{num_sd:g}'):
+            guardado = self.cargar(ruta)
+            corte = self._corte(guardado, tiempos, cierres)
+            self.ultimas_recalculadas = len(tiempos) - corte
+            if corte == len(tiempos):
+                indicadores = guardado
+            else:
+                if corte == 0:
+                    indicadores = _calcular_tramo(tiempos, cierres, ventana, num_sd)
+                else:
+                    inicio = max(0, corte - (ventana - 1))
+                    cola = _calcular_tramo(tiempos[inicio:], cierres[inicio:], ventana, num_sd, calentamiento=corte - inicio)
+                    indicadores = {nombre: np.concatenate([guardado[nombre][:corte], cola[nombre]]) for nombre in cola}
+                self.guardar(ruta, {'time': np.asarray(tiempos, dtype=np.int64),
+                                    'ultimo_cierre': np.float64(cierres[-1] if len(cierres) else np.nan), **indicadores})
+        return pd.DataFrame({'time': df['time'], 'close': df['close'],
+                             **{nombre: indicadores[nombre] for nombre in COLUMNAS_INDICADORES},
+                             'signal': indicadores['signal']}, index=df.index, copy=False)
+
+
+# Caché compartida por todas las sesiones del proceso
+cache_indicadores = CacheIndicadores()
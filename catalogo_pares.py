@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+import time
+
+from almacen_ohlc import DIRECTORIO_DATOS
+from planificador_kraken import ApiPlanificada
+
+# Segundos que se considera vigente el catálogo antes de refrescarlo en segundo plano
+TTL_CATALOGO = 6 * 60 * 60
+
+
+# Catálogo de pares de Kraken compartido por todas las sesiones del proceso
+class CatalogoPares:
+    def __init__(self, ttl=TTL_CATALOGO, ruta=os.path.join(DIRECTORIO_DATOS, 'asset_pairs.json'), crear_api=ApiPlanificada):
+        self.ttl = ttl
+        self.ruta = ruta
+        self.crear_api = crear_api
+        self.ultimo_error = None
+        self._pares = None
+        self._obtenido = 0
+        self._cerrojo = threading.Lock()
+        self._cerrojo_inicial = threading.Lock()
+        self._refrescando = False
+
+    def _descargar(self):
+        resp = self.crear_api().query_public('AssetPairs')
+        if resp.get('error'):
+            raise RuntimeError(', '.join(resp['error']))
+        return resp['result']
+
+    def _guardar(self, pares, obtenido):
+        try:
+            os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            with open(temporal, 'w') as f:
+                json.dump({'obtenido': obtenido, 'pares': pares}, f)
+            os.replace(temporal, self.ruta)
+        except OSError:
+            pass
+
+    # Recuperar la última copia buena guardada en disco (arranque en frío)
+    def _cargar(self):
+        try:
+            with open(self.ruta) as f:
+                datos = json.load(f)
+            return datos['pares'], datos['obtenido']
+        except (OSError, ValueError, KeyError):
+            return None, 0
+
+    def _refrescar(self):
+        try:
+            pares = self._descargar()
+            obtenido = time.time()
+            with self._cerrojo:
+                self._pares, self._obtenido = pares, obtenido
+                self.ultimo_error = None
+            self._guardar(pares, obtenido)
+        except Exception as e:
+            # Se sigue sirviendo la última copia buena
+            self.ultimo_error = e
+        finally:
+            self._refrescando = False
+
+    # Devolver el diccionario de pares sin bloquear salvo la primera vez
+    def pares(self):
+        with self._cerrojo:
+            if self._pares is None:
+                self._pares, self._obtenido = self._cargar()
+            pares = self._pares
+            caducado = time.time() - self._obtenido >= self.ttl
+            lanzar = pares is not None and caducado and not self._refrescando
+            if lanzar:
+                self._refrescando = True
+
+        if pares is None:
+            # Sólo una sesión descarga el catálogo la primera vez; el resto espera
+            with self._cerrojo_inicial:
+                if self._pares is None:
+                    self._refrescar()
+            if self._pares is None:
+                raise self.ultimo_error
+            return self._pares
+        if lanzar:
+            threading.Thread(target=self._refrescar, daemon=True).start()
+        return pares
+
+    def nombres(self):
+        return list(self.pares().keys())
+
+
+# Instancia única para todo el proceso
+catalogo = CatalogoPares()
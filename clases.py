@@ -1,53 +1,57 @@
 import streamlit as st
-import krakenex
-import pandas as pd
 import plotly.graph_objects as go
-from PIL import Image
+import indicadores
+from almacen_ohlc import almacen
+from cache_figuras import memorizar_figura
+from catalogo_pares import catalogo
+from eventos_senales import ENTRADA_COMPRA, ENTRADA_VENTA, IndiceEventos
+from planificador_kraken import PRIORIDAD_ALTA, ApiPlanificada
+from submuestreo import PUNTOS_MAXIMOS, PUNTOS_POR_PIXEL, reducir_lineas, reducir_velas
+from trazas import PUNTOS_MAXIMOS_VELAS, clase_scatter
 
 # Clase para encapsular la funcionalidad de visualización de Kraken
 class VisualizadorKraken:
     def __init__(self):
-        self.api = krakenex.API()
+        self.api = ApiPlanificada(PRIORIDAD_ALTA)
+        self.rango = None
+        self.puntos_maximos = PUNTOS_MAXIMOS
         
     # Función para obtener datos OHLC
     def get_ohlc_data(self, pair, interval=60):
+        # Leer del almacén local y pedir a Kraken sólo las velas nuevas
         try:
-            resp = self.api.query_public('OHLC', {'pair': pair, 'interval': interval})
-            return resp['result'][pair]
+            return almacen.dataframe(almacen.actualizar(self.api, pair, interval))
         except Exception as e:
+            columnas, _, _ = almacen.cargar(pair, interval)
+            if columnas is not None:
+                st.warning(f"No se pudo actualizar desde Kraken ({e}). Se muestran los datos guardados.")
+                return almacen.dataframe(columnas)
             st.error(f"Error al obtener datos de Kraken: {e}")
             return None
 
-    # Función para calcular Bandas de Bollinger
+    # Función para calcular Bandas de Bollinger (vistas sobre los precios, sin copiar el marco)
     def calcular_bandas_bollinger(self, df, ventana=20, num_sd=2):
-        df_bollinger = df.copy()
-        df_bollinger['media_móvil'] = df_bollinger['close'].rolling(window=ventana).mean()
-        df_bollinger['desviación_estándar'] = df_bollinger['close'].rolling(window=ventana).std()
-        df_bollinger['banda_superior'] = df_bollinger['media_móvil'] + (df_bollinger['desviación_estándar'] * num_sd)
-        df_bollinger['banda_inferior'] = df_bollinger['media_móvil'] - (df_bollinger['desviación_estándar'] * num_sd)
-
-        #Convertir las columnas relevantes a formato float
-        df_bollinger['close'] = df_bollinger['close'].astype(float)
-        df_bollinger['banda_inferior'] = df_bollinger['banda_inferior'].astype(float)
-        df_bollinger['banda_superior'] = df_bollinger['banda_superior'].astype(float)
-        
-        return df_bollinger
+        return indicadores.calcular_bandas_bollinger(df, ventana, num_sd)
 
     # Función para calcular señales de compra/venta
     def calcular_senales(self, df_bollinger):
-        df_bollinger['signal'] = 0
-        df_bollinger = df_bollinger.dropna(subset=['close', 'banda_inferior', 'banda_superior'])
-       
-        #Cálculo de las señales
-        df_bollinger.loc[df_bollinger['close'] < df_bollinger['banda_inferior'], 'signal'] = 1
-        df_bollinger.loc[df_bollinger['close'] > df_bollinger['banda_superior'], 'signal'] = -1
-        
-        return df_bollinger
+        return indicadores.calcular_senales(df_bollinger)
+
+    # Función para recortar al rango visible (dentro de él se usa la resolución completa)
+    def recortar(self, df):
+        if self.rango is None:
+            return df
+        inicio, fin = self.rango
+        return df[(df['time'] >= inicio) & (df['time'] <= fin)]
 
     # Función para graficar datos de precios
+    @memorizar_figura
     def graficar_datos(self, df, par_seleccionado):
+        df = self.recortar(df)
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df['time'], y=df['close'], mode='lines', name=f'Precio de cierre de {par_seleccionado}', line=dict(color='blue')))
+        df_grafico = reducir_lineas(df, ['close'], self.puntos_maximos)
+        Scatter = clase_scatter(len(df_grafico))
+        fig.add_trace(Scatter(x=df_grafico['time'], y=df_grafico['close'], mode='lines', name=f'Precio de cierre de {par_seleccionado}', line=dict(color='blue')))
         fig.update_layout(
             title=f'Movimiento del par {par_seleccionado}',
             xaxis_title='Fecha',
@@ -57,11 +61,15 @@ class VisualizadorKraken:
         return fig
 
     # Función para graficar Bandas de Bollinger
+    @memorizar_figura
     def graficar_bandas_bollinger(self, df_bollinger, par_seleccionado):
+        df_bollinger = reducir_lineas(self.recortar(df_bollinger), ['banda_superior', 'banda_inferior', 'media_móvil'], self.puntos_maximos)
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['banda_superior'], mode='lines', name='Upper Band', line=dict(color='red', dash='dot')))
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['banda_inferior'], mode='lines', name='Lower Band', line=dict(color='green', dash='dot')))
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['media_móvil'], mode='lines', name='Moving Average', line=dict(color='orange')))
+        # Tres trazas sobre el mismo eje: cuenta el total de puntos de la figura
+        Scatter = clase_scatter(3 * len(df_bollinger))
+        fig.add_trace(Scatter(x=df_bollinger['time'], y=df_bollinger['banda_superior'], mode='lines', name='Upper Band', line=dict(color='red', dash='dot')))
+        fig.add_trace(Scatter(x=df_bollinger['time'], y=df_bollinger['banda_inferior'], mode='lines', name='Lower Band', line=dict(color='green', dash='dot')))
+        fig.add_trace(Scatter(x=df_bollinger['time'], y=df_bollinger['media_móvil'], mode='lines', name='Moving Average', line=dict(color='orange')))
         fig.update_layout(
             title=f'Bandas de Bollinger para {par_seleccionado}',
             xaxis_title='Fecha',
@@ -71,16 +79,22 @@ class VisualizadorKraken:
         return fig
 
     # Función para graficar señales de compra/venta
-    def graficar_senales(self, df_bollinger, par_seleccionado):
+    @memorizar_figura
+    def graficar_senales(self, df_bollinger, par_seleccionado, eventos):
+        # Eventos de entrada sobre todo el histórico, consultados después en el rango visible
+        eventos = eventos.rango(*(self.rango or (None, None)))
+        df_bollinger = self.recortar(df_bollinger)
+        df_grafico = reducir_lineas(df_bollinger, ['close'], self.puntos_maximos)
+        Scatter = clase_scatter(len(df_grafico) + len(eventos))
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['close'], mode='lines', name='Precio de cierre', line=dict(color='blue')))
+        fig.add_trace(Scatter(x=df_grafico['time'], y=df_grafico['close'], mode='lines', name='Precio de cierre', line=dict(color='blue')))
         
-        #Añadir señales de compra y venta
-        buy_signals = df_bollinger[df_bollinger['signal'] == 1]
-        sell_signals = df_bollinger[df_bollinger['signal'] == -1]
+        # Las señales se toman de los datos completos: nunca se descartan al reducir
+        buy_signals = eventos.rango(tipo=ENTRADA_COMPRA).dataframe()
+        sell_signals = eventos.rango(tipo=ENTRADA_VENTA).dataframe()
         
-        fig.add_trace(go.Scatter(x=buy_signals['time'], y=buy_signals['close'], mode='markers', name='Señal de Compra', marker=dict(color='green', symbol='triangle-up', size=10)))
-        fig.add_trace(go.Scatter(x=sell_signals['time'], y=sell_signals['close'], mode='markers', name='Señal de Venta', marker=dict(color='red', symbol='triangle-down', size=10)))
+        fig.add_trace(Scatter(x=buy_signals['time'], y=buy_signals['close'], mode='markers', name='Señal de Compra', marker=dict(color='green', symbol='triangle-up', size=10)))
+        fig.add_trace(Scatter(x=sell_signals['time'], y=sell_signals['close'], mode='markers', name='Señal de Venta', marker=dict(color='red', symbol='triangle-down', size=10)))
        
         fig.update_layout(
             title=f'Señales de Compra y Venta para {par_seleccionado}',
@@ -91,7 +105,9 @@ class VisualizadorKraken:
         return fig
 
     # Función para graficar gráfico de velas
+    @memorizar_figura
     def graficar_velas(self, df, par_seleccionado):
+        df = reducir_velas(self.recortar(df), min(self.puntos_maximos or PUNTOS_MAXIMOS_VELAS, PUNTOS_MAXIMOS_VELAS) // PUNTOS_POR_PIXEL)
         fig = go.Figure(data=[go.Candlestick(x=df['time'],
                                               open=df['open'],
                                               high=df['high'],
@@ -109,15 +125,13 @@ class VisualizadorKraken:
 visualizador = VisualizadorKraken()
 
 # Título de la aplicación y logo
-image = Image.open('logo_app.png')
-st.image(image, width=200)
+st.image('logo_app.png', width=200)
 st.title("Visualización del Movimiento de un Par de Monedas en Kraken")
 st.write("Esta aplicación permite seleccionar un par de monedas de Kraken, visualizar su precio histórico en diferentes formatos, y calcular Bandas de Bollinger para identificar señales de compra y venta. Las Bandas de Bollinger incluyen la media móvil y las bandas superior e inferior, que representan la variabilidad del precio. La aplicación tiene como objetivo facilitar el análisis visual y técnico de las criptomonedas deseadas.")
 
 # Obtener todos los pares de criptomonedas
 try:
-    resp_pairs = visualizador.api.query_public('AssetPairs')
-    all_pairs = list(resp_pairs['result'].keys())
+    all_pairs = catalogo.nombres()
 except Exception as e:
     st.error(f"Error al obtener los pares de monedas: {e}")
     all_pairs = []
@@ -125,18 +139,26 @@ except Exception as e:
 # Input de usuario: selección de par de monedas
 par_seleccionado = st.selectbox("Selecciona el par de monedas:", all_pairs)
 
+# Rango visible: al acercarse se envía la resolución completa de ese tramo
+if 'df_precios' in st.session_state:
+    tiempos = st.session_state['df_precios']['time']
+    inicio, fin = tiempos.iloc[0].to_pydatetime(), tiempos.iloc[-1].to_pydatetime()
+    if inicio < fin:
+        rango = st.sidebar.slider("Rango visible", min_value=inicio, max_value=fin, value=(inicio, fin), format="YYYY-MM-DD HH:mm")
+        visualizador.rango = rango if rango != (inicio, fin) else None
+
 # Botón para descargar y graficar datos
 if st.button("Descargar y graficar datos"):
     datos_ohlc = visualizador.get_ohlc_data(par_seleccionado, interval=60)
     if datos_ohlc is not None:
-        columnas = ['time', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count']
-        df_precios = pd.DataFrame(datos_ohlc, columns=columnas)
-        df_precios['time'] = pd.to_datetime(df_precios['time'], unit='s')
+        df_precios = datos_ohlc
         st.session_state['df_precios'] = df_precios
         fig = visualizador.graficar_datos(df_precios, par_seleccionado)
         st.plotly_chart(fig)
         df_bollinger = visualizador.calcular_bandas_bollinger(df_precios)
         st.session_state['df_bollinger'] = df_bollinger
+        # Las señales se calculan una vez y se guardan como eventos dispersos
+        st.session_state['eventos'] = IndiceEventos.desde_dataframe(visualizador.calcular_senales(df_bollinger))
 
 # Mostrar las Bandas de Bollinger
 if st.button("Mostrar Bandas de Bollinger"):
@@ -153,20 +175,16 @@ if st.button("Mostrar Bandas de Bollinger"):
 
 # Mostrar señales de compra/venta
 if st.button("Mostrar Señales de Compra y Venta"):
-    if 'df_bollinger' not in st.session_state:
+    if 'eventos' not in st.session_state:
         st.warning("Primero descarga y grafica los datos del par de monedas.")
     else:
-        df_bollinger = st.session_state['df_bollinger']
-        df_bollinger = visualizador.calcular_senales(df_bollinger)
+        eventos = st.session_state['eventos']
 
         # Mostrar señales de compra y venta
-        compra_count = df_bollinger[df_bollinger['signal'] == 1].shape[0]
-        venta_count = df_bollinger[df_bollinger['signal'] == -1].shape[0]
-        
-        st.write(f"**Señales de Compra:** {compra_count}")
-        st.write(f"**Señales de Venta:** {venta_count}")
+        st.write(f"**Señales de Compra:** {eventos.contar(ENTRADA_COMPRA)}")
+        st.write(f"**Señales de Venta:** {eventos.contar(ENTRADA_VENTA)}")
         
-        fig_senales = visualizador.graficar_senales(df_bollinger, par_seleccionado)
+        fig_senales = visualizador.graficar_senales(st.session_state['df_bollinger'], par_seleccionado, eventos)
         st.write("Esta gráfica muestra las señales de compra y venta basadas en las Bandas de Bollinger.")
         st.plotly_chart(fig_senales)
 
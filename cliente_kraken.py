@@ -0,0 +1,137 @@
+import logging
+import os
+import threading
+import time
+
+import krakenex
+import requests
+from krakenex import version
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Cliente HTTP de Kraken creado una sola vez por proceso: pool de conexiones keep-alive, gzip,
+# timeouts por defecto y estadísticas de reutilización de conexiones en cada petición.
+
+# Conexiones abiertas que se mantienen por host
+TAMANO_POOL = 8
+
+# Segundos para abrir la conexión (TCP+TLS) y para esperar la respuesta
+TIMEOUT_CONEXION = float(os.environ.get('KRAKEN_TIMEOUT_CONEXION', 3.05))
+TIMEOUT_LECTURA = float(os.environ.get('KRAKEN_TIMEOUT_LECTURA', 15))
+
+logger = logging.getLogger('kraken.cliente')
+
+# Marca por hilo de la conexión nueva abierta durante la petición en curso
+_local = threading.local()
+
+
+class _ConexionMedida:
+    # connect() sólo se llama al abrir una conexión; una conexión reutilizada del pool no pasa por aquí
+    def connect(self):
+        inicio = time.perf_counter()
+        super().connect()
+        _local.segundos_conexion = time.perf_counter() - inicio
+
+
+class ConexionHttp(_ConexionMedida, HTTPConnection):
+    pass
+
+
+class ConexionHttps(_ConexionMedida, HTTPSConnection):
+    pass
+
+
+class PoolHttp(HTTPConnectionPool):
+    ConnectionCls = ConexionHttp
+
+
+class PoolHttps(HTTPSConnectionPool):
+    ConnectionCls = ConexionHttps
+
+
+class AdaptadorKraken(HTTPAdapter):
+    def __init__(self, tamano_pool=TAMANO_POOL, timeout=(TIMEOUT_CONEXION, TIMEOUT_LECTURA)):
+        self.timeout = timeout
+        self.peticiones = 0
+        self.reutilizadas = 0
+        self.segundos_conexion = 0.0
+        self._cerrojo = threading.Lock()
+        # Sólo se reintentan los fallos al conectar: la petición aún no ha llegado a Kraken
+        super().__init__(pool_connections=2, pool_maxsize=tamano_pool, max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.2))
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': PoolHttp, 'https': PoolHttps}
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        # krakenex pasa timeout=None si no se indica; sin límite una conexión colgada bloquearía al hilo
+        _local.segundos_conexion = None
+        inicio = time.perf_counter()
+        respuesta = super().send(request, stream, self.timeout if timeout is None else timeout, verify, cert, proxies)
+        segundos_conexion = _local.segundos_conexion
+        respuesta.conexion = {
+            'reutilizada': segundos_conexion is None,
+            'segundos_conexion': segundos_conexion or 0.0,
+            'segundos': time.perf_counter() - inicio,
+            # Aún no contada en bytes_recibidos (varias sesiones pueden compartir la misma respuesta)
+            'sin_contar': True,
+        }
+        with self._cerrojo:
+            self.peticiones += 1
+            self.reutilizadas += segundos_conexion is None
+            self.segundos_conexion += segundos_conexion or 0.0
+        logger.debug("%s %s %s", request.method, request.url, respuesta.conexion)
+        return respuesta
+
+    def estadisticas(self):
+        with self._cerrojo:
+            return {'peticiones': self.peticiones, 'reutilizadas': self.reutilizadas,
+                    'conexiones_nuevas': self.peticiones - self.reutilizadas,
+                    'segundos_conexion': round(self.segundos_conexion, 4)}
+
+
+# Bytes que llegaron por la red (comprimidos, no el cuerpo ya descomprimido) la primera vez que se pide
+# para una respuesta; las siguientes devuelven 0 para que una respuesta compartida se cuente una sola vez
+def bytes_recibidos(respuesta):
+    conexion = getattr(respuesta, 'conexion', None)
+    if conexion is None or not conexion.pop('sin_contar', False):
+        return 0
+    try:
+        return int(respuesta.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        return int(respuesta.headers.get('Content-Length') or len(respuesta.content))
+
+
+def crear_sesion(tamano_pool=TAMANO_POOL):
+    sesion = requests.Session()
+    adaptador = AdaptadorKraken(tamano_pool)
+    sesion.mount('https://', adaptador)
+    sesion.mount('http://', adaptador)
+    sesion.headers.update({
+        'User-Agent': 'krakenex/' + version.__version__ + ' (+' + version.__url__ + ')',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return sesion, adaptador
+
+
+# Sesión única del proceso; sobrevive a las recargas de Streamlit porque el módulo sólo se importa una vez
+sesion, adaptador = crear_sesion()
+
+_apis = threading.local()
+
+
+# Un objeto krakenex por hilo (guarda la última respuesta), todos sobre la misma sesión
+def api_del_hilo():
+    api = getattr(_apis, 'api', None)
+    if api is None:
+        api = krakenex.API()
+        api.session = sesion
+        _apis.api = api
+    return api
+
+
+def estadisticas():
+    return adaptador.estadisticas()
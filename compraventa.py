@@ -1,11 +1,12 @@
 import streamlit as st
-import krakenex
 import pandas as pd
 import plotly.graph_objects as go
 from PIL import Image
+from catalogo_pares import catalogo
+from planificador_kraken import PRIORIDAD_ALTA, ApiPlanificada
 
 # Configurar la API de Kraken
-api = krakenex.API()
+api = ApiPlanificada(PRIORIDAD_ALTA)
 
 # Función para obtener datos OHLC
 def get_ohlc_data(pair, interval=60):
@@ -96,8 +97,7 @@ st.write("Esta aplicación permite visualizar el movimiento de un par de monedas
 
 # Obtener todos los pares de criptomonedas
 try:
-    resp_pairs = api.query_public('AssetPairs')
-    all_pairs = list(resp_pairs['result'].keys())
+    all_pairs = catalogo.nombres()
 except Exception as e:
     st.error(f"Error al obtener los pares de monedas: {e}")
     all_pairs = []
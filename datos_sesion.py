@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+# Datos recientes de cada sesión por (par, intervalo): precios, bandas y eventos listos para mostrar,
+# de modo que volver a un par ya visto no obliga a descargar ni recalcular nada
+
+# Presupuesto de memoria por sesión
+BYTES_MAXIMOS_SESION = 128 * 1024 * 1024
+
+
+# Tamaño de una entrada. Las velas suelen ser vistas compartidas del almacén, pero se cuentan enteras:
+# si el almacén las sustituye, la sesión pasa a ser la única que las mantiene vivas
+def bytes_datos(df_precios, df_bollinger, eventos=None):
+    total = int(df_precios.memory_usage(index=True).sum())
+    total += sum(df_bollinger[nombre].nbytes for nombre in df_bollinger.columns if nombre not in df_precios.columns)
+    if eventos is not None:
+        total += eventos.tiempos.nbytes + eventos.precios.nbytes + eventos.tipos.nbytes
+    return total
+
+
+# LRU de datos por (par, intervalo) con límite de bytes; la entrada más reciente se conserva aunque lo supere
+class DatosPares:
+    def __init__(self, bytes_maximos=BYTES_MAXIMOS_SESION):
+        self.bytes_maximos = bytes_maximos
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos = OrderedDict()
+
+    def obtener(self, par, intervalo):
+        entrada = self._datos.get((par, intervalo))
+        if entrada is None:
+            self.fallos += 1
+            return None
+        self._datos.move_to_end((par, intervalo))
+        self.aciertos += 1
+        return entrada
+
+    # 'parametros' son los de las bandas de df_bollinger (ventana, num_sd), p. ej. para exportarlos
+    def guardar(self, par, intervalo, df_precios, df_bollinger, eventos=None, parametros=None):
+        clave = (par, intervalo)
+        anterior = self._datos.pop(clave, None)
+        if anterior is not None:
+            self.bytes -= anterior['bytes']
+        entrada = {'df_precios': df_precios, 'df_bollinger': df_bollinger, 'eventos': eventos,
+                   'parametros': dict(parametros or {}), 'bytes': bytes_datos(df_precios, df_bollinger, eventos)}
+        self._datos[clave] = entrada
+        self.bytes += entrada['bytes']
+        while self.bytes > self.bytes_maximos and len(self._datos) > 1:
+            _, expulsada = self._datos.popitem(last=False)
+            self.bytes -= expulsada['bytes']
+        return entrada
+
+    def claves(self):
+        return list(self._datos)
+
+    def __contains__(self, clave):
+        return clave in self._datos
+
+    def __len__(self):
+        return len(self._datos)
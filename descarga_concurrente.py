@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from almacen_ohlc import almacen
+from planificador_kraken import MAX_HILOS, PRIORIDAD_NORMAL, ApiPlanificada
+
+
+def _descargar(par, interval, prioridad):
+    # El planificador aplica el límite de tasa y comparte peticiones idénticas en vuelo
+    return almacen.dataframe(almacen.actualizar(ApiPlanificada(prioridad), par, interval))
+
+
+# Descargar varios pares a la vez; devuelve ({par: DataFrame}, {par: error})
+def get_ohlc_data_many(pairs, interval=60, max_workers=MAX_HILOS, prioridad=PRIORIDAD_NORMAL):
+    pares = list(dict.fromkeys(pairs))
+    datos, errores = {}, {}
+    if not pares:
+        return datos, errores
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pares))) as pool:
+        futuros = {par: pool.submit(_descargar, par, interval, prioridad) for par in pares}
+        for par, futuro in futuros.items():
+            try:
+                datos[par] = futuro.result()
+            except Exception as e:
+                errores[par] = e
+    return datos, errores
@@ -0,0 +1,91 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from almacen_ohlc import almacen
+from catalogo_pares import catalogo
+from descarga_concurrente import get_ohlc_data_many
+from indicadores import calcular_bandas_bollinger, calcular_senales, resumir_ultima_vela
+from planificador_kraken import PRIORIDAD_BAJA
+
+# Escáner de todo el mercado: descarga (con límite de tasa) las velas de cada par de AssetPairs,
+# calcula Bandas de Bollinger y señales repartiendo el cálculo entre procesos y ordena los pares
+# según lo lejos que está el último cierre de sus bandas.
+
+# Pares que se envían juntos a cada proceso para amortizar la comunicación
+PARES_POR_TAREA = 16
+
+
+# Evaluar un lote de pares en un proceso: recibe (par, tiempos, cierres) y devuelve una fila por par
+def evaluar_pares(lote, ventana=20, num_sd=2):
+    filas = []
+    for par, tiempos, cierres in lote:
+        if len(cierres) < ventana:
+            continue
+        df = pd.DataFrame({'time': tiempos.astype('datetime64[s]'), 'close': cierres})
+        df_bollinger = calcular_bandas_bollinger(df, ventana, num_sd)
+        df_senales = calcular_senales(df_bollinger)
+        if df_senales.empty:
+            continue
+        filas.append({'par': par, **resumir_ultima_vela(df_senales)})
+    return filas
+
+
+# Leer las velas de cada par: del almacén si están frescas o se pide no descargar, de Kraken si no
+def obtener_velas(pares, intervalo=60, descargar=True):
+    if descargar:
+        datos, errores = get_ohlc_data_many(pares, intervalo, prioridad=PRIORIDAD_BAJA)
+        velas = {par: (df.index.to_numpy(), df['close'].to_numpy()) for par, df in datos.items()}
+    else:
+        velas, errores = {}, {}
+        for par in pares:
+            columnas, _, _ = almacen.cargar(par, intervalo)
+            if columnas is not None:
+                velas[par] = (columnas['time'], columnas['close'])
+    return velas, errores
+
+
+# Escanear el mercado y devolver la tabla ordenada: primero los pares con señal, después por |z|
+def escanear(pares=None, intervalo=60, ventana=20, num_sd=2, procesos=None, descargar=True):
+    pares = pares or catalogo.nombres()
+    velas, errores = obtener_velas(pares, intervalo, descargar)
+    elementos = [(par, tiempos, cierres) for par, (tiempos, cierres) in velas.items()]
+    lotes = [elementos[i:i + PARES_POR_TAREA] for i in range(0, len(elementos), PARES_POR_TAREA)]
+
+    filas = []
+    if lotes:
+        # 'spawn' evita copiar hilos y sockets abiertos del proceso principal (p. ej. Streamlit)
+        contexto = multiprocessing.get_context('spawn')
+        procesos = min(procesos or os.cpu_count() or 1, len(lotes))
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            for resultado in pool.map(evaluar_pares, lotes, [ventana] * len(lotes), [num_sd] * len(lotes)):
+                filas.extend(resultado)
+
+    tabla = pd.DataFrame(filas, columns=['par', 'time', 'close', 'media_móvil', 'banda_superior', 'banda_inferior',
+                                         'signal', 'porcentaje_b', 'z'])
+    if not tabla.empty:
+        tabla['con_senal'] = tabla['signal'] != 0
+        tabla['abs_z'] = tabla['z'].abs()
+        tabla = tabla.sort_values(['con_senal', 'abs_z'], ascending=False).drop(columns=['con_senal', 'abs_z'])
+    return tabla.reset_index(drop=True), errores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Buscar en todos los pares de Kraken los que rompen sus Bandas de Bollinger.")
+    parser.add_argument('--intervalo', type=int, default=60)
+    parser.add_argument('--ventana', type=int, default=20)
+    parser.add_argument('--num-sd', type=float, default=2)
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--sin-descarga', action='store_true', help="usar sólo las velas ya guardadas")
+    parser.add_argument('--top', type=int, default=30)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tabla, errores = escanear(intervalo=args.intervalo, ventana=args.ventana, num_sd=args.num_sd,
+                              procesos=args.procesos, descargar=not args.sin_descarga)
+    print(tabla.head(args.top).to_string())
+    print(f"{len(tabla)} pares evaluados, {len(errores)} errores, {time.perf_counter() - inicio:.1f} s")
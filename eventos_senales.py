@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Índice disperso de señales: en lugar de una columna 'signal' casi toda a cero se guardan sólo los
+# cambios (entradas y salidas) ordenados por tiempo. Las consultas por rango usan búsqueda binaria
+# y los recuentos salen de sumas acumuladas precalculadas.
+
+# Tipos de evento: la entrada conserva el valor de la señal (1 compra, -1 venta); la salida lo duplica
+ENTRADA_COMPRA = 1
+ENTRADA_VENTA = -1
+SALIDA_COMPRA = 2
+SALIDA_VENTA = -2
+TIPOS = [ENTRADA_COMPRA, ENTRADA_VENTA, SALIDA_COMPRA, SALIDA_VENTA]
+
+NOMBRES_TIPOS = {
+    ENTRADA_COMPRA: 'entrada_compra',
+    ENTRADA_VENTA: 'entrada_venta',
+    SALIDA_COMPRA: 'salida_compra',
+    SALIDA_VENTA: 'salida_venta',
+}
+
+
+# Convertir un instante (época en segundos, fecha o Timestamp) en segundos desde la época
+def a_segundos(instante):
+    if isinstance(instante, (int, np.integer)):
+        return int(instante)
+    return int(pd.Timestamp(instante).timestamp())
+
+
+class IndiceEventos:
+    def __init__(self, tiempos, precios, tipos):
+        self.tiempos = np.asarray(tiempos, dtype=np.int64)
+        self.precios = np.asarray(precios, dtype=np.float64)
+        self.tipos = np.asarray(tipos, dtype=np.int8)
+        # Recuentos acumulados por tipo: contar cualquier rango es una resta
+        self._acumulados = {tipo: np.concatenate([[0], np.cumsum(self.tipos == tipo)]) for tipo in TIPOS}
+
+    # Detectar los flancos de una señal densa: cada cambio de valor cierra la señal anterior y abre la nueva
+    @classmethod
+    def desde_senales(cls, tiempos, precios, senales):
+        senales = np.asarray(senales, dtype=np.int8)
+        anteriores = np.concatenate([[0], senales[:-1]]).astype(np.int8)
+        cambios = np.flatnonzero(senales != anteriores)
+        salidas = cambios[anteriores[cambios] != 0]
+        entradas = cambios[senales[cambios] != 0]
+        # Con un salto directo de compra a venta la salida va antes que la entrada en la misma vela
+        posiciones = np.concatenate([salidas, entradas])
+        tipos = np.concatenate([anteriores[salidas] * 2, senales[entradas]]).astype(np.int8)
+        orden = np.argsort(posiciones, kind='stable')
+        posiciones = posiciones[orden]
+        return cls(np.asarray(tiempos)[posiciones], np.asarray(precios)[posiciones], tipos[orden])
+
+    # A partir del DataFrame de calcular_senales ('time', 'close' y 'signal')
+    @classmethod
+    def desde_dataframe(cls, df_senales):
+        tiempos = df_senales['time'].to_numpy().astype('datetime64[s]').view(np.int64)
+        return cls.desde_senales(tiempos, df_senales['close'].to_numpy(), df_senales['signal'].to_numpy())
+
+    def __len__(self):
+        return len(self.tiempos)
+
+    # Posiciones [inicio, fin) de los eventos con inicio <= tiempo <= fin, por búsqueda binaria
+    def _limites(self, inicio=None, fin=None):
+        izquierda = 0 if inicio is None else np.searchsorted(self.tiempos, a_segundos(inicio), side='left')
+        derecha = len(self.tiempos) if fin is None else np.searchsorted(self.tiempos, a_segundos(fin), side='right')
+        return izquierda, max(izquierda, derecha)
+
+    # Eventos entre dos instantes (ambos incluidos) como un nuevo índice
+    def rango(self, inicio=None, fin=None, tipo=None):
+        izquierda, derecha = self._limites(inicio, fin)
+        tiempos, precios, tipos = self.tiempos[izquierda:derecha], self.precios[izquierda:derecha], self.tipos[izquierda:derecha]
+        if tipo is not None:
+            seleccion = tipos == tipo
+            tiempos, precios, tipos = tiempos[seleccion], precios[seleccion], tipos[seleccion]
+        return IndiceEventos(tiempos, precios, tipos)
+
+    # Número de eventos (de un tipo o de todos); sin rango es O(1) y con rango O(log n)
+    def contar(self, tipo=None, inicio=None, fin=None):
+        izquierda, derecha = self._limites(inicio, fin)
+        if tipo is None:
+            return derecha - izquierda
+        acumulado = self._acumulados[tipo]
+        return int(acumulado[derecha] - acumulado[izquierda])
+
+    def dataframe(self):
+        return pd.DataFrame({
+            'time': self.tiempos.view('datetime64[s]'),
+            'close': self.precios,
+            'tipo': pd.Categorical.from_codes([TIPOS.index(tipo) for tipo in self.tipos], [NOMBRES_TIPOS[tipo] for tipo in TIPOS]),
+        })
@@ -1,13 +1,14 @@
 import streamlit as st
-import krakenex
 import pandas as pd
 import plotly.graph_objects as go
 from PIL import Image
+from catalogo_pares import catalogo
+from planificador_kraken import PRIORIDAD_ALTA, ApiPlanificada
 
 class KrakenApp:
     def __init__(self):
         # Configurar la API de Kraken
-        self.api = krakenex.API()
+        self.api = ApiPlanificada(PRIORIDAD_ALTA)
         self.df_precios = None
         self.df_bollinger = None
 
@@ -77,8 +78,7 @@ class KrakenApp:
 
         # Obtener todos los pares de criptomonedas
         try:
-            resp_pairs = self.api.query_public('AssetPairs')
-            all_pairs = list(resp_pairs['result'].keys())
+            all_pairs = catalogo.nombres()
         except Exception as e:
             st.error(f"Error al obtener los pares de monedas: {e}")
             all_pairs = []
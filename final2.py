@@ -1,45 +1,81 @@
 import streamlit as st
-import krakenex
-import pandas as pd
 import plotly.graph_objects as go
-from PIL import Image
+import cliente_kraken
+import indicadores
+import nucleo_kraken
+from cache_figuras import memorizar_figura
+from cache_indicadores import cache_indicadores
+from catalogo_pares import catalogo
+from datos_sesion import DatosPares
+from eventos_senales import ENTRADA_COMPRA, ENTRADA_VENTA, IndiceEventos
+from instrumentacion import instrumentacion, instrumentar
+from parseo_ohlc import COLUMNAS, columnas_dataframe
+from planificador_kraken import PRIORIDAD_ALTA, ApiPlanificada, planificador
+from streaming_kraken import VelasEnVivo, obtener_flujo
+from submuestreo import PUNTOS_MAXIMOS, PUNTOS_POR_PIXEL, reducir_lineas, reducir_velas
+from trazas import PUNTOS_MAXIMOS_VELAS, clase_scatter
+
+# Columnas de precios que usa la aplicación; el resto (vwap, volume, count) no se carga en la sesión
+COLUMNAS_APP = ['time', 'open', 'high', 'low', 'close']
+
+# Resoluciones que se ofrecen para los gráficos de líneas (None: todas las velas, sin reducir)
+RESOLUCIONES = [PUNTOS_MAXIMOS, 20_000, 100_000, None]
+
+# Temporalidades que se ofrecen en la barra lateral (en minutos)
+TEMPORALIDADES = [5, 15, 30, 60, 240, 1440, 10080]
+
+
+def nombre_temporalidad(minutos):
+    if minutos % 1440 == 0:
+        return f"{minutos // 1440} d"
+    if minutos % 60 == 0:
+        return f"{minutos // 60} h"
+    return f"{minutos} min"
+
 
 class KrakenApp:
     def __init__(self):
-        # Configurar la API de Kraken
-        self.api = krakenex.API()
+        # Configurar la API de Kraken: las peticiones pasan por el planificador compartido entre sesiones
+        self.api = ApiPlanificada(PRIORIDAD_ALTA)
         self.df_precios = None
         self.df_bollinger = None
+        self.eventos = None
+        self.rango = None
+        self.puntos_maximos = PUNTOS_MAXIMOS
 
-    def get_ohlc_data(self, pair, interval=60):
+    def get_ohlc_data(self, pair, interval=60, refrescar=True, nombres=COLUMNAS_APP):
+        # Leer del almacén local y pedir a Kraken sólo las velas nuevas (ver nucleo_kraken.obtener_velas)
         try:
-            resp = self.api.query_public('OHLC', {'pair': pair, 'interval': interval})
-            return resp['result'][pair]
+            df, aviso = nucleo_kraken.obtener_velas(pair, interval, self.api, refrescar, nombres=nombres)
         except Exception as e:
             st.error(f"Error al obtener datos de Kraken: {e}")
             return None
+        if aviso is not None:
+            st.warning(f"No se pudo actualizar desde Kraken ({aviso}). Se muestran los datos guardados.")
+        return df
 
-    def calcular_bandas_bollinger(self, df, ventana=20, num_sd=2):
-        df_bollinger = df.copy()
-        df_bollinger['media_móvil'] = df_bollinger['close'].rolling(window=ventana).mean()
-        df_bollinger['desviación_estándar'] = df_bollinger['close'].rolling(window=ventana).std()
-        df_bollinger['banda_superior'] = df_bollinger['media_móvil'] + (df_bollinger['desviación_estándar'] * num_sd)
-        df_bollinger['banda_inferior'] = df_bollinger['media_móvil'] - (df_bollinger['desviación_estándar'] * num_sd)
-
-        df_bollinger['close'] = df_bollinger['close'].astype(float)
-        df_bollinger['banda_inferior'] = df_bollinger['banda_inferior'].astype(float)
-        df_bollinger['banda_superior'] = df_bollinger['banda_superior'].astype(float)
-
-        return df_bollinger
+    # Con par e intervalo las bandas se leen de la caché en disco y sólo se recalculan las velas nuevas
+    @instrumentar('calcular_bandas_bollinger')
+    def calcular_bandas_bollinger(self, df, ventana=20, num_sd=2, par=None, intervalo=None):
+        if par is not None and intervalo is not None:
+            return cache_indicadores.bandas(par, intervalo, df, ventana, num_sd)
+        return indicadores.calcular_bandas_bollinger(df, ventana, num_sd)
 
+    @instrumentar('calcular_senales')
     def calcular_senales(self, df_bollinger):
-        df_bollinger['signal'] = 0
-        df_bollinger = df_bollinger.dropna(subset=['close', 'banda_inferior', 'banda_superior'])
-        df_bollinger.loc[df_bollinger['close'] < df_bollinger['banda_inferior'], 'signal'] = 1  # Señal de compra
-        df_bollinger.loc[df_bollinger['close'] > df_bollinger['banda_superior'], 'signal'] = -1  # Señal de venta
-        return df_bollinger
+        return indicadores.calcular_senales(df_bollinger)
 
+    # Recortar al rango visible elegido; dentro de él se vuelve a la resolución completa
+    def recortar(self, df):
+        if self.rango is None:
+            return df
+        inicio, fin = self.rango
+        return df[(df['time'] >= inicio) & (df['time'] <= fin)]
+
+    @instrumentar('graficar_datos')
+    @memorizar_figura
     def graficar_datos(self, df, par_seleccionado):
+        df = self.recortar(df)
         if len(df) < 2:
             st.error("No hay suficientes datos para calcular el cambio porcentual.")
             return None
@@ -55,7 +91,9 @@ class KrakenApp:
         color_cambio = 'green' if cambio_porcentual > 0 else 'red'
 
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df['time'], y=df['close'], mode='lines', name=f'Precio de cierre de {par_seleccionado}', line=dict(color='blue')))
+        df_grafico = reducir_lineas(df, ['close'], self.puntos_maximos)
+        Scatter = clase_scatter(len(df_grafico))
+        fig.add_trace(Scatter(x=df_grafico['time'], y=df_grafico['close'], mode='lines', name=f'Precio de cierre de {par_seleccionado}', line=dict(color='blue')))
         
         # Añadir anotación de cambio porcentual
         fig.add_annotation(
@@ -73,40 +111,142 @@ class KrakenApp:
         fig.update_layout(title=f'Movimiento del par {par_seleccionado}', xaxis_title='Fecha', yaxis_title='Precio de cierre (EUR)', hovermode="x unified")
         return fig
 
+    @instrumentar('graficar_bandas_bollinger')
+    @memorizar_figura
     def graficar_bandas_bollinger(self, df_bollinger, par_seleccionado):
+        df_bollinger = reducir_lineas(self.recortar(df_bollinger), ['banda_superior', 'banda_inferior', 'media_móvil'], self.puntos_maximos)
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['banda_superior'], mode='lines', name='Banda Superior', line=dict(color='red', dash='dot')))
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['banda_inferior'], mode='lines', name='Banda Inferior', line=dict(color='green', dash='dot')))
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['media_móvil'], mode='lines', name='Media Móvil', line=dict(color='orange')))
+        # Tres trazas sobre el mismo eje: cuenta el total de puntos de la figura
+        Scatter = clase_scatter(3 * len(df_bollinger))
+        fig.add_trace(Scatter(x=df_bollinger['time'], y=df_bollinger['banda_superior'], mode='lines', name='Banda Superior', line=dict(color='red', dash='dot')))
+        fig.add_trace(Scatter(x=df_bollinger['time'], y=df_bollinger['banda_inferior'], mode='lines', name='Banda Inferior', line=dict(color='green', dash='dot')))
+        fig.add_trace(Scatter(x=df_bollinger['time'], y=df_bollinger['media_móvil'], mode='lines', name='Media Móvil', line=dict(color='orange')))
         fig.update_layout(title=f'Bandas de Bollinger para {par_seleccionado}', xaxis_title='Fecha', yaxis_title='Precio (EUR)', hovermode="x unified")
         return fig
 
-    def graficar_senales(self, df_bollinger, par_seleccionado):
+    @instrumentar('graficar_senales')
+    @memorizar_figura
+    def graficar_senales(self, df_bollinger, par_seleccionado, eventos):
+        # Marcadores sólo donde empieza cada señal, sacados del índice de eventos en lugar de filtrar todo el marco
+        eventos = eventos.rango(*(self.rango or (None, None)))
+        buy_signals = eventos.rango(tipo=ENTRADA_COMPRA).dataframe()
+        sell_signals = eventos.rango(tipo=ENTRADA_VENTA).dataframe()
+        df_grafico = reducir_lineas(self.recortar(df_bollinger), ['close'], self.puntos_maximos)
+        Scatter = clase_scatter(len(df_grafico) + len(eventos))
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_bollinger['time'], y=df_bollinger['close'], mode='lines', name='Precio de cierre', line=dict(color='blue')))
-        buy_signals = df_bollinger[df_bollinger['signal'] == 1]
-        sell_signals = df_bollinger[df_bollinger['signal'] == -1]
-        fig.add_trace(go.Scatter(x=buy_signals['time'], y=buy_signals['close'], mode='markers', name='Señal de Compra', marker=dict(color='green', symbol='triangle-up', size=10)))
-        fig.add_trace(go.Scatter(x=sell_signals['time'], y=sell_signals['close'], mode='markers', name='Señal de Venta', marker=dict(color='red', symbol='triangle-down', size=10)))
+        fig.add_trace(Scatter(x=df_grafico['time'], y=df_grafico['close'], mode='lines', name='Precio de cierre', line=dict(color='blue')))
+        fig.add_trace(Scatter(x=buy_signals['time'], y=buy_signals['close'], mode='markers', name='Señal de Compra', marker=dict(color='green', symbol='triangle-up', size=10)))
+        fig.add_trace(Scatter(x=sell_signals['time'], y=sell_signals['close'], mode='markers', name='Señal de Venta', marker=dict(color='red', symbol='triangle-down', size=10)))
         fig.update_layout(title=f'Señales de Compra y Venta para {par_seleccionado}', xaxis_title='Fecha', yaxis_title='Precio (EUR)', hovermode="x unified")
         return fig
 
+    @instrumentar('graficar_velas')
+    @memorizar_figura
     def graficar_velas(self, df, par_seleccionado):
+        df = reducir_velas(self.recortar(df), min(self.puntos_maximos or PUNTOS_MAXIMOS_VELAS, PUNTOS_MAXIMOS_VELAS) // PUNTOS_POR_PIXEL)
         fig = go.Figure(data=[go.Candlestick(x=df['time'], open=df['open'], high=df['high'], low=df['low'], close=df['close'])])
         fig.update_layout(title=f'Gráfico de Velas para {par_seleccionado}', xaxis_title='Fecha', yaxis_title='Precio (EUR)', hovermode="x unified")
         return fig
 
+    # Datos recientes de esta sesión por (par, temporalidad), con límite de memoria
+    def datos_pares(self):
+        if 'datos_pares' not in st.session_state:
+            st.session_state['datos_pares'] = DatosPares()
+        return st.session_state['datos_pares']
+
+    def guardar_datos(self, df_precios, par_seleccionado, temporalidad, ventana=20, num_sd=2):
+        # Guardar en la sesión los precios y sus Bandas de Bollinger. Ambos marcos son vistas de las velas
+        # compartidas del almacén más las columnas calculadas, así que la sesión sólo guarda referencias
+        df_bollinger = self.calcular_bandas_bollinger(df_precios, ventana, num_sd, par=par_seleccionado, intervalo=temporalidad)
+        # Las señales se guardan como eventos dispersos: los recuentos de cada recarga no recorren el marco
+        eventos = IndiceEventos.desde_dataframe(self.calcular_senales(df_bollinger))
+        parametros = {'ventana': ventana, 'num_sd': num_sd}
+        self.activar_datos(self.datos_pares().guardar(par_seleccionado, temporalidad, df_precios, df_bollinger, eventos, parametros),
+                           par_seleccionado, temporalidad)
+
+    # Hacer actuales los datos de un par ya calculado
+    def activar_datos(self, entrada, par_seleccionado, temporalidad):
+        self.df_precios = entrada['df_precios']
+        self.df_bollinger = entrada['df_bollinger']
+        self.eventos = entrada['eventos']
+        st.session_state['df_precios'] = self.df_precios
+        st.session_state['df_bollinger'] = self.df_bollinger
+        st.session_state['eventos'] = self.eventos
+        st.session_state['parametros_bollinger'] = entrada['parametros']
+        st.session_state['par_seleccionado'] = par_seleccionado
+        st.session_state['temporalidad'] = temporalidad
+
+    def mostrar_grafico(self, fig):
+        # Medir también la serialización y el envío de la figura al navegador
+        with instrumentacion.medir('st.plotly_chart'):
+            st.plotly_chart(fig)
+
+    def mostrar_depuracion(self):
+        # Panel opcional con los tiempos, bytes y picos de memoria de cada etapa
+        with st.sidebar.expander("Instrumentación", expanded=True):
+            if not instrumentacion.memoria_activa:
+                st.caption("Picos de memoria desactivados: arranca el servidor con KRAKEN_TRAZAR_MEMORIA=1.")
+            else:
+                st.caption("Picos de memoria aproximados: se mezclan si hay otras sesiones trabajando a la vez.")
+            if instrumentacion.tramos:
+                st.dataframe([{k: v for k, v in tramo.items() if k != 'fin'} for tramo in list(instrumentacion.tramos)[-30:]])
+            else:
+                st.write("Todavía no hay mediciones.")
+            st.write("Planificador de peticiones:", planificador.estadisticas())
+            st.write("Conexiones HTTP:", cliente_kraken.estadisticas())
+            datos_pares = self.datos_pares()
+            st.write(f"Pares en la sesión: {len(datos_pares)} ({datos_pares.bytes / 1e6:.1f} MB de "
+                     f"{datos_pares.bytes_maximos / 1e6:.0f} MB), aciertos {datos_pares.aciertos}, fallos {datos_pares.fallos}")
+            st.download_button("Descargar registros (JSON)", instrumentacion.exportar_json(), file_name='tramos.jsonl')
+            st.download_button("Descargar métricas (Prometheus)", instrumentacion.exportar_prometheus(), file_name='metricas.prom')
+
+    def mostrar_exportacion(self):
+        import intercambio_arrow
+
+        par, temporalidad = st.session_state['par_seleccionado'], st.session_state['temporalidad']
+        df_precios, df_bollinger = st.session_state['df_precios'], st.session_state['df_bollinger']
+        metadatos = {'par': par, 'intervalo': temporalidad, **st.session_state['parametros_bollinger']}
+        nombre = f"{par}_{temporalidad}"
+
+        # Los ficheros se generan al pulsar el botón (en otro hilo), no en cada recarga de la página
+        def generar(codificar):
+            return lambda: codificar(intercambio_arrow.tabla_analisis(df_precios, df_bollinger), metadatos)
+
+        st.sidebar.download_button("Descargar Arrow IPC", generar(intercambio_arrow.bytes_arrow), file_name=f"{nombre}.arrow")
+        st.sidebar.download_button("Descargar Parquet", generar(intercambio_arrow.bytes_parquet), file_name=f"{nombre}.parquet")
+
+    def mostrar_en_vivo(self, par_seleccionado, temporalidad):
+        # Las velas de la temporalidad elegida llegan por websocket y se añaden a las descargadas al activar el modo
+        flujo = obtener_flujo(temporalidad)
+        par_ws = catalogo.pares().get(par_seleccionado, {}).get('wsname', par_seleccionado)
+        velas = flujo.velas.get(par_ws)
+        if velas is None:
+            df = self.get_ohlc_data(par_seleccionado, interval=temporalidad, nombres=COLUMNAS)
+            velas = flujo.suscribir(par_ws, VelasEnVivo(columnas_dataframe(df) if df is not None else None))
+
+        @st.fragment(run_every=2)
+        def panel_en_vivo():
+            df = velas.dataframe()
+            estado = velas.estado()
+            if flujo.ultimo_error and not flujo.conectado:
+                st.warning(f"Reconectando con el websocket de Kraken: {flujo.ultimo_error}")
+            fig = self.graficar_datos(df, par_seleccionado)
+            if fig:
+                self.mostrar_grafico(fig)
+            st.write(f"**Media móvil:** {estado['media_móvil']:.5f} | **Banda superior:** {estado['banda_superior']:.5f} | "
+                     f"**Banda inferior:** {estado['banda_inferior']:.5f} | **Señal:** {estado['signal']}")
+
+        panel_en_vivo()
+
     def run(self):
         # Título de la aplicación y logo
-        image = Image.open('logo_app.png')
-        st.image(image, width=200)
+        st.image('logo_app.png', width=200)
         st.title("Visualización del Par de Monedas en Kraken")
         st.write("Esta aplicación permite seleccionar un par de monedas de Kraken, visualizar su precio histórico en diferentes formatos, y calcular Bandas de Bollinger para identificar señales de compra y venta. Las Bandas de Bollinger incluyen la media móvil y las bandas superior e inferior, que representan la variabilidad del precio. La aplicación tiene como objetivo facilitar el análisis visual y técnico de las criptomonedas deseadas.")
         
         # Obtener todos los pares de criptomonedas
         try:
-            resp_pairs = self.api.query_public('AssetPairs')
-            all_pairs = list(resp_pairs['result'].keys())
+            all_pairs = catalogo.nombres()
         except Exception as e:
             st.error(f"Error al obtener los pares de monedas: {e}")
             all_pairs = []
@@ -114,20 +254,52 @@ class KrakenApp:
         # Input de usuario: selección de par de monedas
         par_seleccionado = st.selectbox("Selecciona el par de monedas:", all_pairs)
 
+        # Temporalidad: cambiarla remuestrea las velas ya guardadas, sin pedir nada a Kraken
+        temporalidad = st.sidebar.selectbox("Temporalidad", TEMPORALIDADES, index=TEMPORALIDADES.index(60), format_func=nombre_temporalidad)
+        actuales = (st.session_state.get('par_seleccionado'), st.session_state.get('temporalidad'))
+        if 'df_precios' in st.session_state and actuales != (par_seleccionado, temporalidad):
+            # Un par o temporalidad vistos hace poco siguen calculados en la sesión: el cambio es inmediato
+            entrada = self.datos_pares().obtener(par_seleccionado, temporalidad)
+            if entrada is not None:
+                self.activar_datos(entrada, par_seleccionado, temporalidad)
+            elif actuales[0] == par_seleccionado:
+                datos_ohlc = self.get_ohlc_data(par_seleccionado, interval=temporalidad, refrescar=False)
+                if datos_ohlc is not None:
+                    self.guardar_datos(datos_ohlc, par_seleccionado, temporalidad)
+
+        # Panel de depuración con la instrumentación de cada etapa
+        if st.sidebar.checkbox("Panel de depuración"):
+            self.mostrar_depuracion()
+
+        # Modo en vivo: actualizaciones por websocket en lugar de descargas repetidas
+        if st.sidebar.checkbox("Modo en vivo (websocket)") and par_seleccionado:
+            self.mostrar_en_vivo(par_seleccionado, temporalidad)
+
+        # Rango visible: al acercarse se envía la resolución completa de ese tramo
+        if 'df_precios' in st.session_state:
+            tiempos = st.session_state['df_precios']['time']
+            inicio, fin = tiempos.iloc[0].to_pydatetime(), tiempos.iloc[-1].to_pydatetime()
+            if inicio < fin:
+                rango = st.sidebar.slider("Rango visible", min_value=inicio, max_value=fin, value=(inicio, fin), format="YYYY-MM-DD HH:mm")
+                self.rango = rango if rango != (inicio, fin) else None
+
+        # Puntos enviados por gráfico; por encima de UMBRAL_WEBGL las trazas pasan a WebGL
+        self.puntos_maximos = st.sidebar.select_slider("Puntos por gráfico", RESOLUCIONES, value=PUNTOS_MAXIMOS,
+                                                       format_func=lambda puntos: "Todos" if puntos is None else f"{puntos:,}")
+
+        # Exportar precios, bandas y señales para otras herramientas (pyarrow sólo se importa si se pide)
+        if 'df_bollinger' in st.session_state and st.sidebar.checkbox("Exportar análisis"):
+            self.mostrar_exportacion()
+
         # Botón para descargar y graficar datos
         if st.button("Descargar y graficar datos"):
-            datos_ohlc = self.get_ohlc_data(par_seleccionado, interval=60)
+            datos_ohlc = self.get_ohlc_data(par_seleccionado, interval=temporalidad)
             if datos_ohlc is not None:
-                columnas = ['time', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count']
-                self.df_precios = pd.DataFrame(datos_ohlc, columns=columnas)
-                self.df_precios['time'] = pd.to_datetime(self.df_precios['time'], unit='s')
-                st.session_state['df_precios'] = self.df_precios
+                self.guardar_datos(datos_ohlc, par_seleccionado, temporalidad)
                 fig = self.graficar_datos(self.df_precios, par_seleccionado)
                 if fig:  # Solo mostrar la gráfica si no hay error
                     st.write("Esta gráfica muestra el movimiento histórico del precio de cierre para el par de monedas seleccionado.")
-                    st.plotly_chart(fig)
-                self.df_bollinger = self.calcular_bandas_bollinger(self.df_precios)
-                st.session_state['df_bollinger'] = self.df_bollinger
+                    self.mostrar_grafico(fig)
 
         # Mostrar las Bandas de Bollinger al presionar el botón
         if st.button("Mostrar Bandas de Bollinger"):
@@ -138,18 +310,21 @@ class KrakenApp:
                 if df_bollinger['media_móvil'].notna().any():
                     fig_bb = self.graficar_bandas_bollinger(df_bollinger, par_seleccionado)
                     st.write("Esta gráfica muestra las Bandas de Bollinger para el par seleccionado.")
-                    st.plotly_chart(fig_bb)
+                    self.mostrar_grafico(fig_bb)
 
         # Mostrar señales al presionar el botón
         if st.button("Mostrar Señales de Compra/Venta"):
-            if 'df_bollinger' not in st.session_state:
+            if 'eventos' not in st.session_state:
                 st.warning("Primero descarga y grafica los datos del par de monedas.")
             else:
-                df_bollinger = st.session_state['df_bollinger']
-                df_bollinger = self.calcular_senales(df_bollinger)
-                fig_senales = self.graficar_senales(df_bollinger, par_seleccionado)
+                # Los eventos se calcularon al cargar los datos: aquí no se vuelve a recorrer el marco
+                eventos = st.session_state['eventos']
+                fig_senales = self.graficar_senales(st.session_state['df_bollinger'], par_seleccionado, eventos)
                 st.write("Esta gráfica muestra las señales de compra y venta según las Bandas de Bollinger.")
-                st.plotly_chart(fig_senales)
+                self.mostrar_grafico(fig_senales)
+                inicio, fin = self.rango or (None, None)
+                st.write(f"**Señales de compra:** {eventos.contar(ENTRADA_COMPRA, inicio, fin)} | "
+                         f"**Señales de venta:** {eventos.contar(ENTRADA_VENTA, inicio, fin)}")
 
         # Mostrar gráfico de velas al presionar el botón
         if st.button("Mostrar Gráfico de Velas"):
@@ -159,7 +334,7 @@ class KrakenApp:
                 df_precios = st.session_state['df_precios']
                 fig_velas = self.graficar_velas(df_precios, par_seleccionado)
                 st.write("Esta gráfica muestra el gráfico de velas para el par seleccionado.")
-                st.plotly_chart(fig_velas)
+                self.mostrar_grafico(fig_velas)
 
 # Iniciar la aplicación
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+import numpy as np
+
+from motor_indicadores import calcular_indicadores
+
+# Cálculo de indicadores sin dependencias de la interfaz (se puede usar desde scripts y procesos).
+# Los resultados sólo llevan 'time' y 'close' del marco de precios, como vistas sin copia, más las
+# columnas calculadas: el marco base (compartido y de sólo lectura) nunca se duplica.
+
+
+# Función para calcular Bandas de Bollinger (el resto de indicadores está en motor_indicadores)
+def calcular_bandas_bollinger(df, ventana=20, num_sd=2):
+    return calcular_indicadores(df, {'bollinger': {'ventana': ventana, 'num_sd': num_sd}})
+
+
+# Función para calcular señales de compra/venta
+def calcular_senales(df_bollinger):
+    cierres = df_bollinger['close'].to_numpy()
+    inferior = df_bollinger['banda_inferior'].to_numpy()
+    superior = df_bollinger['banda_superior'].to_numpy()
+    # Se descartan las filas sin bandas (el calentamiento de la ventana); si forman un prefijo basta
+    # con un corte, que no copia, en lugar de filtrar con una máscara
+    validas = np.flatnonzero(~(np.isnan(cierres) | np.isnan(inferior) | np.isnan(superior)))
+    if len(validas) and validas[-1] - validas[0] + 1 == len(validas):
+        filas = slice(validas[0], validas[-1] + 1)
+    else:
+        filas = validas
+    # Compra (1) por debajo de la banda inferior, venta (-1) por encima de la superior
+    senal = np.where(cierres[filas] < inferior[filas], 1, np.where(cierres[filas] > superior[filas], -1, 0)).astype(np.int8)
+    return df_bollinger.iloc[filas].assign(signal=senal)
+
+
+# Resumen de la última vela de calcular_senales: bandas, señal, %B y distancia a la media en desviaciones
+def resumir_ultima_vela(df_senales):
+    ultima = df_senales.iloc[-1]
+    ancho = ultima['banda_superior'] - ultima['banda_inferior']
+    return {
+        'time': ultima['time'],
+        'close': ultima['close'],
+        'media_móvil': ultima['media_móvil'],
+        'banda_superior': ultima['banda_superior'],
+        'banda_inferior': ultima['banda_inferior'],
+        'signal': int(ultima['signal']),
+        # %B: 0 en la banda inferior, 1 en la superior; fuera de [0, 1] el precio ha roto una banda
+        'porcentaje_b': (ultima['close'] - ultima['banda_inferior']) / ancho if ancho else np.nan,
+        'z': (ultima['close'] - ultima['media_móvil']) / ultima['desviación_estándar'] if ultima['desviación_estándar'] else 0.0,
+    }
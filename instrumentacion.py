@@ -0,0 +1,128 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger('kraken.instrumentacion')
+
+# Tramos recientes que se guardan para el panel de depuración
+MAXIMO_TRAMOS = 500
+
+# Medir picos de memoria con tracemalloc. Es un ajuste de todo el proceso (tracemalloc es global y
+# ralentiza a todas las sesiones), así que se decide al arrancar: KRAKEN_TRAZAR_MEMORIA=1 (o
+# PYTHONTRACEMALLOC, que lo activa antes incluso de importar nada)
+TRAZAR_MEMORIA = os.environ.get('KRAKEN_TRAZAR_MEMORIA', '') not in ('', '0')
+
+
+# Registro de tramos (spans): tiempo de reloj, bytes transferidos y pico de memoria de cada etapa
+class Instrumentacion:
+    def __init__(self, maximo=MAXIMO_TRAMOS):
+        self.tramos = deque(maxlen=maximo)
+        self.totales = {}
+        self._cerrojo = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def memoria_activa(self):
+        return tracemalloc.is_tracing()
+
+    # Sólo para scripts de un único proceso y un único hilo (benchmarks); la aplicación usa TRAZAR_MEMORIA
+    def activar_memoria(self, activa=True):
+        if activa and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not activa and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _pila(self):
+        if not hasattr(self._local, 'pila'):
+            self._local.pila = []
+        return self._local.pila
+
+    # El pico de memoria de tracemalloc es global al proceso: sólo es fiable si no hay otros tramos a la
+    # vez en otros hilos o sesiones (cada tramo reinicia el pico y se mezclan las asignaciones de todos)
+    @contextmanager
+    def medir(self, nombre, **etiquetas):
+        tramo = {'etapa': nombre, 'bytes': 0, **etiquetas}
+        pila = self._pila()
+        memoria = tracemalloc.is_tracing()
+        if memoria:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        pila.append([])
+        inicio = time.perf_counter()
+        try:
+            yield tramo
+        finally:
+            tramo['segundos'] = time.perf_counter() - inicio
+            picos_hijos = pila.pop()
+            if memoria and tracemalloc.is_tracing():
+                # Los tramos anidados reinician el pico; se combina con el de los hijos
+                pico = max([tracemalloc.get_traced_memory()[1]] + picos_hijos)
+                tramo['pico_memoria'] = max(pico - base, 0)
+                if pila:
+                    pila[-1].append(pico)
+            tramo['fin'] = time.time()
+            self._registrar(tramo)
+
+    def _registrar(self, tramo):
+        with self._cerrojo:
+            self.tramos.append(tramo)
+            total = self.totales.setdefault(tramo['etapa'], {'llamadas': 0, 'segundos': 0.0, 'bytes': 0, 'pico_memoria': 0})
+            total['llamadas'] += 1
+            total['segundos'] += tramo['segundos']
+            total['bytes'] += tramo['bytes']
+            total['pico_memoria'] = max(total['pico_memoria'], tramo.get('pico_memoria', 0))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(tramo, default=str))
+
+    # Registros estructurados: una línea JSON por tramo
+    def exportar_json(self):
+        with self._cerrojo:
+            return '\n'.join(json.dumps(tramo, default=str) for tramo in self.tramos)
+
+    # Métricas en formato de texto de Prometheus
+    def exportar_prometheus(self):
+        with self._cerrojo:
+            totales = {etapa: dict(total) for etapa, total in self.totales.items()}
+        lineas = [
+            '# HELP kraken_etapa_llamadas_total Número de ejecuciones de cada etapa.',
+            '# TYPE kraken_etapa_llamadas_total counter',
+        ]
+        lineas += [f'kraken_etapa_llamadas_total{{etapa="{etapa}"}} {t["llamadas"]}' for etapa, t in totales.items()]
+        lineas += ['# HELP kraken_etapa_segundos_total Tiempo acumulado de cada etapa.',
+                   '# TYPE kraken_etapa_segundos_total counter']
+        lineas += [f'kraken_etapa_segundos_total{{etapa="{etapa}"}} {t["segundos"]:.6f}' for etapa, t in totales.items()]
+        lineas += ['# HELP kraken_etapa_bytes_total Bytes transferidos por cada etapa.',
+                   '# TYPE kraken_etapa_bytes_total counter']
+        lineas += [f'kraken_etapa_bytes_total{{etapa="{etapa}"}} {t["bytes"]}' for etapa, t in totales.items()]
+        lineas += ['# HELP kraken_etapa_pico_memoria_bytes Mayor pico de memoria observado en cada etapa.',
+                   '# TYPE kraken_etapa_pico_memoria_bytes gauge']
+        lineas += [f'kraken_etapa_pico_memoria_bytes{{etapa="{etapa}"}} {t["pico_memoria"]}' for etapa, t in totales.items()]
+        return '\n'.join(lineas) + '\n'
+
+    def vaciar(self):
+        with self._cerrojo:
+            self.tramos.clear()
+            self.totales.clear()
+
+
+# Instancia compartida por todo el proceso
+instrumentacion = Instrumentacion()
+if TRAZAR_MEMORIA:
+    instrumentacion.activar_memoria(True)
+
+
+# Decorador para medir una función o método completo como un tramo
+def instrumentar(nombre):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with instrumentacion.medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
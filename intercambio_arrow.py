@@ -0,0 +1,78 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from indicadores import calcular_senales
+
+# Intercambio del análisis (precios + bandas + señales) con otros procesos. Arrow IPC se lee con
+# memory-map y sin copia: las columnas del DataFrame apuntan directamente al fichero mapeado.
+# Parquet ocupa menos en disco pero hay que decodificarlo al leer.
+
+# Clave de los metadatos propios dentro del esquema Arrow
+CLAVE_METADATOS = b'kraken'
+
+
+# Una sola tabla con las velas, las Bandas de Bollinger y la señal de cada vela (0 durante el calentamiento)
+def tabla_analisis(df_precios, df_bollinger):
+    df_senales = calcular_senales(df_bollinger)
+    senal = np.zeros(len(df_bollinger), dtype=np.int8)
+    senal[df_bollinger.index.get_indexer(df_senales.index)] = df_senales['signal'].to_numpy()
+    columnas = {nombre: df_precios[nombre] for nombre in df_precios.columns}
+    for nombre in ['media_móvil', 'desviación_estándar', 'banda_superior', 'banda_inferior']:
+        columnas[nombre] = df_bollinger[nombre]
+    columnas['signal'] = senal
+    return pd.DataFrame(columnas, index=df_precios.index, copy=False)
+
+
+# Los NaN del calentamiento se guardan como NaN y no como nulos: una columna con nulos no se puede
+# pasar a pandas sin copiarla
+def _tabla_arrow(df, metadatos):
+    tabla = pa.table({nombre: pa.array(df[nombre].to_numpy(), from_pandas=False) for nombre in df.columns})
+    return tabla.replace_schema_metadata({CLAVE_METADATOS: json.dumps(metadatos or {}).encode()})
+
+
+# Arrow IPC en formato fichero, sin compresión para poder mapearlo y leerlo sin copias
+def exportar_arrow(df, destino, metadatos=None):
+    tabla = _tabla_arrow(df, metadatos)
+    with pa.ipc.new_file(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+
+
+def exportar_parquet(df, destino, metadatos=None):
+    pq.write_table(_tabla_arrow(df, metadatos), destino, compression='zstd')
+
+
+# Bytes listos para st.download_button
+def bytes_arrow(df, metadatos=None):
+    salida = io.BytesIO()
+    exportar_arrow(df, salida, metadatos)
+    return salida.getvalue()
+
+
+def bytes_parquet(df, metadatos=None):
+    salida = io.BytesIO()
+    exportar_parquet(df, salida, metadatos)
+    return salida.getvalue()
+
+
+# Leer un análisis exportado. Devuelve (df, metadatos); el DataFrame tiene el mismo índice 'epoch' y
+# las mismas columnas que usan graficar_datos, graficar_bandas_bollinger, graficar_senales y graficar_velas.
+# Con Arrow IPC las columnas son vistas de sólo lectura del fichero mapeado (que debe seguir existiendo)
+def cargar_analisis(origen):
+    if str(origen).endswith('.parquet'):
+        tabla = pq.read_table(origen, memory_map=True)
+    else:
+        tabla = pa.ipc.open_file(pa.memory_map(str(origen), 'r')).read_all()
+    metadatos = json.loads((tabla.schema.metadata or {}).get(CLAVE_METADATOS, b'{}'))
+    # split_blocks evita consolidar columnas en bloques nuevos, que obligaría a copiarlas
+    df = tabla.to_pandas(split_blocks=True)
+    # Parquet no tiene marcas de tiempo en segundos y las devuelve en milisegundos
+    if df['time'].dtype != np.dtype('datetime64[s]'):
+        df['time'] = df['time'].astype('datetime64[s]')
+    df.index = pd.Index(df['time'].to_numpy().astype('datetime64[s]').view(np.int64), name='epoch', copy=False)
+    return df, metadatos
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+from parseo_ohlc import inicios_tramos
+
+# Motor de indicadores: cada indicador declara las columnas de precios que necesita y se calcula a partir
+# de intermedios compartidos (media y desviación móviles, medias exponenciales, rango verdadero...).
+# Al pedir varios indicadores a la vez cada intermedio se calcula una sola vez y cada columna de entrada
+# se convierte a NumPy una sola vez, aunque lo usen varios indicadores.
+# Si las columnas incluyen 'time' y hay huecos entre velas, ventanas y medias exponenciales se calculan
+# por tramos de velas consecutivas y vuelven a empezar (con su calentamiento) después de cada hueco.
+
+# Indicadores registrados: nombre -> Indicador
+INDICADORES = {}
+
+
+class Indicador:
+    def __init__(self, nombre, entradas, parametros, funcion):
+        self.nombre = nombre
+        self.entradas = entradas
+        self.parametros = parametros
+        self.funcion = funcion
+
+    def calcular(self, contexto, **parametros):
+        desconocidos = set(parametros) - set(self.parametros)
+        if desconocidos:
+            raise ValueError(f"{self.nombre}: parámetros desconocidos {sorted(desconocidos)}")
+        return self.funcion(contexto, **{**self.parametros, **parametros})
+
+
+# Registrar un indicador: la función recibe el contexto y los parámetros y devuelve {columna: array}
+def indicador(nombre, entradas, **parametros):
+    def registrar(funcion):
+        INDICADORES[nombre] = Indicador(nombre, entradas, parametros, funcion)
+        return funcion
+    return registrar
+
+
+# Intermedios de un cálculo, memorizados por (tipo, columna, parámetros)
+class Contexto:
+    def __init__(self, columnas):
+        self.columnas = columnas
+        self.intermedios = {}
+        # Intermedios realmente calculados (los repetidos se sirven de la memoria)
+        self.calculados = 0
+
+    def _memorizar(self, clave, calcular):
+        valor = self.intermedios.get(clave)
+        if valor is None:
+            valor = calcular()
+            self.intermedios[clave] = valor
+            self.calculados += 1
+        return valor
+
+    # Columna de entrada (o intermedio con nombre) como array float64
+    def columna(self, nombre):
+        if isinstance(nombre, tuple):
+            return self.intermedios[nombre]
+        return self._memorizar(('columna', nombre), lambda: np.asarray(self.columnas[nombre], dtype=np.float64))
+
+    # Inicio de cada tramo de velas consecutivas ([0] si no hay 'time' o no hay huecos)
+    def tramos(self):
+        def calcular():
+            if 'time' not in self.columnas:
+                return np.zeros(1, dtype=np.intp)
+            return inicios_tramos(np.asarray(self.columnas['time']))
+        return self._memorizar(('tramos',), calcular)
+
+    # Aplicar una operación de pandas sobre la serie de cada tramo y unir los resultados
+    def _por_tramos(self, nombre, operacion):
+        valores = self.columna(nombre)
+        inicios = self.tramos()
+        if len(inicios) == 1:
+            return operacion(pd.Series(valores, copy=False)).to_numpy()
+        limites = np.append(inicios, len(valores))
+        return np.concatenate([operacion(pd.Series(valores[a:b], copy=False)).to_numpy()
+                               for a, b in zip(limites[:-1], limites[1:])])
+
+    # Anular las primeras 'filas' de cada tramo (calentamiento)
+    def calentar(self, valores, filas):
+        for inicio in self.tramos():
+            valores[inicio:inicio + filas] = np.nan
+        return valores
+
+    # Media y desviación típica (muestral, como pandas) de una ventana móvil sobre la misma ventana
+    def momentos(self, nombre, ventana):
+        return self._memorizar(('momentos', nombre, ventana),
+                               lambda: (self._por_tramos(nombre, lambda serie: serie.rolling(window=ventana).mean()),
+                                        self._por_tramos(nombre, lambda serie: serie.rolling(window=ventana).std())))
+
+    # Media móvil exponencial con periodo 'span' (alfa = 2 / (span + 1))
+    def ema(self, nombre, span):
+        return self._memorizar(('ema', nombre, span),
+                               lambda: self._por_tramos(nombre, lambda serie: serie.ewm(span=span, adjust=False).mean()))
+
+    # Suavizado de Wilder (alfa = 1 / ventana), el de RSI y ATR
+    def wilder(self, nombre, ventana):
+        return self._memorizar(('wilder', nombre, ventana),
+                               lambda: self._por_tramos(nombre, lambda serie: serie.ewm(alpha=1 / ventana, adjust=False).mean()))
+
+    # Subidas y bajadas de cierre a cierre; la primera vela de cada tramo no tiene variación y queda en
+    # NaN, así el suavizado empieza en la primera variación real
+    def variaciones(self, nombre='close'):
+        def calcular():
+            cambio = np.diff(self.columna(nombre), prepend=np.nan)
+            subidas, bajadas = np.where(cambio > 0, cambio, 0.0), np.where(cambio < 0, -cambio, 0.0)
+            subidas[self.tramos()] = bajadas[self.tramos()] = np.nan
+            return subidas, bajadas
+        subidas, bajadas = self._memorizar(('variaciones', nombre), calcular)
+        self.intermedios[('subidas', nombre)] = subidas
+        self.intermedios[('bajadas', nombre)] = bajadas
+        return ('subidas', nombre), ('bajadas', nombre)
+
+    # Rango verdadero: el mayor de máximo - mínimo y la distancia de cada extremo al cierre anterior
+    def rango_verdadero(self):
+        def calcular():
+            maximos, minimos, cierres = self.columna('high'), self.columna('low'), self.columna('close')
+            anterior = np.concatenate([[np.nan], cierres[:-1]])
+            # Después de un hueco el cierre anterior no es la vela previa
+            anterior[self.tramos()] = np.nan
+            return np.fmax(maximos - minimos, np.fmax(np.abs(maximos - anterior), np.abs(minimos - anterior)))
+        self._memorizar(('rango_verdadero',), calcular)
+        return ('rango_verdadero',)
+
+
+@indicador('bollinger', ['close'], ventana=20, num_sd=2)
+def _bollinger(contexto, ventana, num_sd):
+    media, desviacion = contexto.momentos('close', ventana)
+    return {
+        'media_móvil': media,
+        'desviación_estándar': desviacion,
+        'banda_superior': media + desviacion * num_sd,
+        'banda_inferior': media - desviacion * num_sd,
+    }
+
+
+# %B: 0 en la banda inferior, 1 en la superior (usa los mismos momentos que 'bollinger')
+@indicador('porcentaje_b', ['close'], ventana=20, num_sd=2)
+def _porcentaje_b(contexto, ventana, num_sd):
+    media, desviacion = contexto.momentos('close', ventana)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'porcentaje_b': (contexto.columna('close') - media + desviacion * num_sd) / (2 * num_sd * desviacion)}
+
+
+@indicador('rsi', ['close'], ventana=14)
+def _rsi(contexto, ventana):
+    subidas, bajadas = contexto.variaciones('close')
+    media_subidas, media_bajadas = contexto.wilder(subidas, ventana), contexto.wilder(bajadas, ventana)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + media_subidas / media_bajadas)
+    # El suavizado de Wilder arranca en la primera variación (como ewm(alpha=1/ventana, adjust=False)),
+    # no en la media simple de las primeras 'ventana' variaciones del RSI original de Wilder: los valores
+    # iniciales difieren un poco de esa variante y la diferencia se desvanece con unas pocas ventanas.
+    # Sin bajadas en la ventana el RSI es 100; las primeras 'ventana' velas son calentamiento
+    rsi = np.where((media_bajadas == 0) & (media_subidas > 0), 100.0, rsi)
+    return {'rsi': contexto.calentar(rsi, ventana)}
+
+
+@indicador('macd', ['close'], rapida=12, lenta=26, senal=9)
+def _macd(contexto, rapida, lenta, senal):
+    macd = contexto.ema('close', rapida) - contexto.ema('close', lenta)
+    contexto.intermedios[('macd', rapida, lenta)] = macd
+    linea_senal = contexto.ema(('macd', rapida, lenta), senal)
+    return {'macd': macd, 'macd_señal': linea_senal, 'macd_histograma': macd - linea_senal}
+
+
+@indicador('atr', ['high', 'low', 'close'], ventana=14)
+def _atr(contexto, ventana):
+    return {'atr': contexto.wilder(contexto.rango_verdadero(), ventana)}
+
+
+# Canales de Keltner: media exponencial del cierre ± multiplicador * ATR
+@indicador('keltner', ['high', 'low', 'close'], ventana=20, ventana_atr=10, multiplicador=2)
+def _keltner(contexto, ventana, ventana_atr, multiplicador):
+    media = contexto.ema('close', ventana)
+    atr = contexto.wilder(contexto.rango_verdadero(), ventana_atr)
+    return {
+        'keltner_media': media,
+        'keltner_superior': media + multiplicador * atr,
+        'keltner_inferior': media - multiplicador * atr,
+    }
+
+
+# Normalizar los indicadores pedidos: lista de nombres o {nombre: {parámetros}}
+def _pedidos(indicadores):
+    if isinstance(indicadores, str):
+        indicadores = [indicadores]
+    if not isinstance(indicadores, dict):
+        indicadores = {nombre: {} for nombre in indicadores}
+    desconocidos = [nombre for nombre in indicadores if nombre not in INDICADORES]
+    if desconocidos:
+        raise ValueError(f"Indicadores desconocidos: {desconocidos} (disponibles: {', '.join(INDICADORES)})")
+    return {nombre: parametros or {} for nombre, parametros in indicadores.items()}
+
+
+# Columnas de precios que necesitan los indicadores pedidos
+def entradas(indicadores):
+    return list(dict.fromkeys(columna for nombre in _pedidos(indicadores) for columna in INDICADORES[nombre].entradas))
+
+
+# Calcular sobre columnas sueltas ({nombre: array}); devuelve {columna: array}
+def calcular(columnas, indicadores, contexto=None):
+    pedidos = _pedidos(indicadores)
+    faltan = [columna for columna in entradas(pedidos) if columna not in columnas]
+    if faltan:
+        raise ValueError(f"Faltan columnas de precios para {', '.join(pedidos)}: {faltan}")
+    contexto = contexto or Contexto(columnas)
+    resultado = {}
+    for nombre, parametros in pedidos.items():
+        resultado.update(INDICADORES[nombre].calcular(contexto, **parametros))
+    return resultado
+
+
+# DataFrame con 'time' y 'close' del marco de precios (vistas, sin copia) y las columnas de los indicadores
+def calcular_indicadores(df, indicadores):
+    resultado = calcular(df, indicadores)
+    return pd.DataFrame({'time': df['time'], 'close': df['close'], **resultado}, index=df.index, copy=False)
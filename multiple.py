@@ -1,18 +1,14 @@
 import streamlit as st
-import krakenex
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-
-# Configurar la API de Kraken
-api = krakenex.API()
+from catalogo_pares import catalogo
+from descarga_concurrente import get_ohlc_data_many
 
 # Título de la aplicación
 st.title("Visualización de Pares de Monedas en Kraken")
 
 # Obtener todos los pares de criptomonedas
-resp_pairs = api.query_public('AssetPairs')
-all_pairs = list(resp_pairs['result'].keys())
+all_pairs = catalogo.nombres()
 
 # Input de usuario: selección de los pares de monedas
 selected_pair1 = st.selectbox("Selecciona el primer par de criptomonedas:", all_pairs)
@@ -20,20 +16,16 @@ selected_pair2 = st.selectbox("Selecciona el segundo par de criptomonedas:", all
 
 # Botón para descargar y graficar datos
 if st.button("Descargar y graficar datos"):
-    # Descargar datos de los pares seleccionados
-    resp1 = api.query_public('OHLC', {'pair': selected_pair1, 'interval': 60})  # Solicita datos de tipo OHLC a la API de Kraken, cada 60 minutos.
-    ohlc_data1 = resp1['result'][selected_pair1]
-
-    resp2 = api.query_public('OHLC', {'pair': selected_pair2, 'interval': 60})  # Solicita datos de tipo OHLC a la API de Kraken, cada 60 minutos.
-    ohlc_data2 = resp2['result'][selected_pair2]
-
-    # Convertir a DataFrame
-    columns = ['time', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count']
-    df1 = pd.DataFrame(ohlc_data1, columns=columns)
-    df1['time'] = pd.to_datetime(df1['time'], unit='s')
-
-    df2 = pd.DataFrame(ohlc_data2, columns=columns)
-    df2['time'] = pd.to_datetime(df2['time'], unit='s')
+    # Descargar datos de los pares seleccionados a la vez, cada 60 minutos
+    datos, errores = get_ohlc_data_many([selected_pair1, selected_pair2], interval=60)
+    for par, error in errores.items():
+        st.error(f"Error al obtener datos de {par}: {error}")
+    if errores:
+        st.stop()
+
+    # Los datos ya llegan como DataFrame con columnas numéricas y fechas
+    df1 = datos[selected_pair1]
+    df2 = datos[selected_pair2]
 
     # Crear el gráfico 
     st.write(f"Graficando los pares {selected_pair1} y {selected_pair2}")
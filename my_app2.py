@@ -1,18 +1,18 @@
 import streamlit as st
-import krakenex
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from catalogo_pares import catalogo
+from planificador_kraken import PRIORIDAD_ALTA, ApiPlanificada
 
 # Configurar la API de Kraken
-api = krakenex.API()
+api = ApiPlanificada(PRIORIDAD_ALTA)
 
 # Título de la aplicación
 st.title("Visualización del Par de Monedas en Kraken")
 
 # Obtener todos los pares de criptomonedas
-resp_pairs = api.query_public('AssetPairs')
-all_pairs = list(resp_pairs['result'].keys())
+all_pairs = catalogo.nombres()
 
 # Input de usuario: selección de par de monedas
 selected_pair = st.selectbox("Selecciona el par de criptomonedas:", all_pairs)
@@ -0,0 +1,154 @@
+import argparse
+import os
+import sys
+import time
+
+# Núcleo sin interfaz de la aplicación: descarga (almacén + planificador), Bandas de Bollinger y señales,
+# utilizable como biblioteca o desde cron. Nada de Streamlit, Plotly, Matplotlib ni PIL; NumPy, pandas y
+# la pila de red se importan dentro de las funciones, así que importar el módulo o pedir --help es inmediato.
+
+FORMATOS = ['csv', 'parquet', 'json']
+
+# Objetivo de arranque en frío (importar el módulo en un intérprete nuevo); lo vigila benchmark_pipeline
+ARRANQUE_OBJETIVO = 0.15
+
+
+# Velas de un par como DataFrame. Devuelve (df, aviso): si Kraken falla pero hay velas guardadas se
+# sirven ésas y 'aviso' es la excepción; si no hay nada guardado la excepción se propaga
+def obtener_velas(par, intervalo=60, api=None, refrescar=True, nombres=None):
+    from almacen_ohlc import almacen
+    from instrumentacion import instrumentacion
+    from remuestreo import VELAS_KRAKEN, VELAS_MINIMAS, intervalo_base, temporalidades
+
+    # Si hay guardado un intervalo más fino con historia suficiente, se remuestrea desde él. Al descargar
+    # tiene que dar más velas de las que Kraken sirve del propio intervalo; sin descargar basta con menos
+    base = intervalo_base(almacen.coberturas(par), intervalo, VELAS_KRAKEN if refrescar else VELAS_MINIMAS)
+    aviso = None
+    try:
+        columnas = None if refrescar else almacen.cargar(par, base)[0]
+        if columnas is None:
+            if api is None:
+                from planificador_kraken import ApiPlanificada
+                api = ApiPlanificada()
+            with instrumentacion.medir('get_ohlc_data', par=par) as tramo:
+                respuesta_anterior = api.response
+                columnas = almacen.actualizar(api, par, base)
+                if api.response is not respuesta_anterior:
+                    from cliente_kraken import bytes_recibidos
+                    # Bytes de la red, contados sólo por la primera sesión que usa una respuesta compartida
+                    tramo['bytes'] = bytes_recibidos(api.response)
+                    tramo['conexion_reutilizada'] = api.response.conexion['reutilizada']
+                    tramo['segundos_conexion'] = api.response.conexion['segundos_conexion']
+    except Exception as e:
+        columnas, _, _ = almacen.cargar(par, base)
+        if columnas is None:
+            raise
+        aviso = e
+    return almacen.dataframe(temporalidades.obtener(par, base, intervalo, columnas), nombres=nombres), aviso
+
+
+# Analizar un par: resumen de la última vela y número de señales de todo el histórico
+def analizar(par, intervalo=60, ventana=20, num_sd=2, api=None, refrescar=True):
+    import indicadores
+    from cache_indicadores import cache_indicadores
+    from eventos_senales import ENTRADA_COMPRA, ENTRADA_VENTA, IndiceEventos
+
+    df, aviso = obtener_velas(par, intervalo, api, refrescar, nombres=['time', 'close'])
+    # Las bandas ya calculadas en pasadas anteriores se leen de disco; sólo se calculan las velas nuevas
+    df_senales = indicadores.calcular_senales(cache_indicadores.bandas(par, intervalo, df, ventana, num_sd))
+    if df_senales.empty:
+        raise ValueError(f"{par}: {len(df)} velas, no llegan a la ventana de {ventana}")
+    eventos = IndiceEventos.desde_dataframe(df_senales)
+    return {
+        'par': par,
+        'intervalo': intervalo,
+        'velas': len(df),
+        **indicadores.resumir_ultima_vela(df_senales),
+        'compras': eventos.contar(ENTRADA_COMPRA),
+        'ventas': eventos.contar(ENTRADA_VENTA),
+        'aviso': str(aviso) if aviso is not None else None,
+    }
+
+
+# Analizar varios pares (las descargas van en paralelo por el planificador); un par que falla
+# aparece con su error en lugar de interrumpir el lote
+def analizar_lote(pares, intervalo=60, ventana=20, num_sd=2, refrescar=True):
+    from concurrent.futures import ThreadPoolExecutor
+
+    import pandas as pd
+
+    def analizar_seguro(par):
+        try:
+            return analizar(par, intervalo, ventana, num_sd, refrescar=refrescar)
+        except Exception as e:
+            return {'par': par, 'intervalo': intervalo, 'error': str(e)}
+
+    pares = list(dict.fromkeys(pares))
+    if not pares:
+        return pd.DataFrame()
+    if refrescar:
+        from planificador_kraken import MAX_HILOS
+        with ThreadPoolExecutor(max_workers=min(MAX_HILOS, len(pares))) as pool:
+            filas = list(pool.map(analizar_seguro, pares))
+    else:
+        filas = [analizar_seguro(par) for par in pares]
+    tabla = pd.DataFrame(filas)
+    if 'error' not in tabla:
+        tabla['error'] = None
+    # Las filas con error dejan huecos: enteros que admiten nulos para no convertirlos en decimales
+    for columna in ['velas', 'signal', 'compras', 'ventas']:
+        if columna in tabla:
+            tabla[columna] = tabla[columna].astype('Int64')
+    return tabla
+
+
+# Escribir la tabla en CSV, Parquet o JSON (por líneas); el formato se deduce de la extensión si no se indica
+def exportar(tabla, destino, formato=None):
+    if formato is None:
+        extension = os.path.splitext(destino)[1].lstrip('.').lower()
+        formato = {'jsonl': 'json', 'pq': 'parquet'}.get(extension, extension) if destino != '-' else 'csv'
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato!r} (usa {', '.join(FORMATOS)})")
+    salida = sys.stdout if destino == '-' else destino
+    if formato == 'csv':
+        tabla.to_csv(salida, index=False)
+    elif formato == 'json':
+        tabla.to_json(salida, orient='records', lines=True, date_format='iso', force_ascii=False)
+        if destino == '-':
+            sys.stdout.write('\n')
+    else:
+        if destino == '-':
+            raise ValueError("Parquet no se puede escribir en la salida estándar")
+        # Necesita pyarrow (o fastparquet); pandas lanza ImportError con el motivo si falta
+        tabla.to_parquet(salida, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis de Bandas de Bollinger de pares de Kraken sin interfaz gráfica.")
+    parser.add_argument('pares', nargs='*', help="pares tal como aparecen en AssetPairs; sin pares, todo el catálogo")
+    parser.add_argument('--intervalo', type=int, default=60, help="minutos por vela")
+    parser.add_argument('--ventana', type=int, default=20)
+    parser.add_argument('--num-sd', type=float, default=2)
+    parser.add_argument('--sin-descarga', action='store_true', help="usar sólo las velas ya guardadas")
+    parser.add_argument('--salida', default='-', help="fichero .csv, .parquet o .json; '-' para la salida estándar")
+    parser.add_argument('--formato', choices=FORMATOS, default=None)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    pares = args.pares
+    if not pares:
+        from catalogo_pares import catalogo
+        pares = catalogo.nombres()
+    tabla = analizar_lote(pares, args.intervalo, args.ventana, args.num_sd, refrescar=not args.sin_descarga)
+    try:
+        exportar(tabla, args.salida, args.formato)
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    errores = int(tabla['error'].notna().sum()) if len(tabla) else 0
+    print(f"{len(tabla)} pares, {errores} errores, {time.perf_counter() - inicio:.2f} s", file=sys.stderr)
+    return 1 if errores == len(tabla) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import instrumentar
+
+COLUMNAS = ['time', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count']
+COLUMNAS_PRECIO = ['open', 'high', 'low', 'close', 'vwap', 'volume']
+
+
+# Convertir las filas de Kraken (enteros y decimales en texto) en columnas NumPy tipadas
+@instrumentar('parseo')
+def parsear_ohlc(filas, dtype=np.float64):
+    n = len(filas)
+    columnas = {
+        'time': np.fromiter(map(itemgetter(0), filas), np.int64, count=n),
+        'count': np.fromiter(map(itemgetter(7), filas), np.int64, count=n),
+    }
+    for i, nombre in enumerate(COLUMNAS_PRECIO, start=1):
+        # Se lee siempre en float64 y después se reduce para no perder el redondeo correcto
+        columna = np.fromiter(map(itemgetter(i), filas), np.float64, count=n)
+        columnas[nombre] = columna if dtype == np.float64 else columna.astype(dtype)
+    return {nombre: columnas[nombre] for nombre in COLUMNAS}
+
+
+# Posiciones donde empieza cada tramo de velas consecutivas (siempre incluye la 0). Un salto mayor que
+# el intervalo es un hueco, p. ej. entre un histórico reconstruido y lo descargado semanas después; los
+# cálculos con ventanas se hacen por tramos para no tratar como seguidas velas que no lo son. Si no se
+# indica el intervalo (en minutos) se toma el menor salto entre velas
+def inicios_tramos(tiempos, intervalo=None):
+    tiempos = np.asarray(tiempos)
+    if tiempos.dtype.kind == 'M':
+        tiempos = tiempos.astype('datetime64[s]').view(np.int64)
+    if len(tiempos) < 2:
+        return np.zeros(1, dtype=np.intp)
+    saltos = np.diff(tiempos)
+    paso = intervalo * 60 if intervalo else saltos.min()
+    return np.concatenate([[0], np.flatnonzero(saltos > paso) + 1])
+
+
+# Marcar las columnas como de sólo lectura: se comparten entre sesiones y nadie debe modificarlas
+def solo_lectura(columnas):
+    for columna in columnas.values():
+        columna.setflags(write=False)
+    return columnas
+
+
+# Construir el DataFrame de precios: índice entero con la época y 'time' como fecha. Las columnas
+# son vistas de los arreglos recibidos (sin copia); 'nombres' limita las columnas que se incluyen
+def dataframe_ohlc(columnas, dtype=None, nombres=None):
+    nombres = COLUMNAS if nombres is None else nombres
+    datos = {}
+    for nombre in nombres:
+        if nombre == 'time':
+            datos[nombre] = columnas['time'].view('datetime64[s]')
+        elif nombre in COLUMNAS_PRECIO and dtype is not None:
+            datos[nombre] = columnas[nombre].astype(dtype, copy=False)
+        else:
+            datos[nombre] = columnas[nombre]
+    return pd.DataFrame(datos, index=pd.Index(columnas['time'], name='epoch', copy=False), copy=False)
+
+
+# Operación inversa de dataframe_ohlc: columnas NumPy (vistas) con 'time' en época tomada del índice
+def columnas_dataframe(df):
+    return {nombre: df.index.to_numpy() if nombre == 'time' else df[nombre].to_numpy() for nombre in COLUMNAS}
+
+
+# Atajo para pasar directamente de la respuesta de Kraken al DataFrame
+def parsear_dataframe(filas, dtype=np.float64):
+    return dataframe_ohlc(parsear_ohlc(filas, dtype))
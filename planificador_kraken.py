@@ -0,0 +1,210 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cliente_kraken import TAMANO_POOL, api_del_hilo
+
+# Planificador central de peticiones públicas a Kraken para todas las sesiones del proceso:
+# cubo de fichas con los límites de Kraken, cola de prioridades y peticiones idénticas en vuelo
+# compartidas (single-flight), de modo que N sesiones mirando el mismo par gastan una sola ficha.
+# Un único despachador espera a tener un hilo libre y alguna petición en la cola, toma entonces una
+# ficha y sólo después saca la petición más urgente: lo que llegue con prioridad alta mientras se
+# espera la ficha sale antes que lo que ya estaba encolado, y en reposo no se guarda ninguna ficha
+# (el cubo lleno ya permite su ráfaga completa; una ficha retenida la alargaría una petición más).
+
+logger = logging.getLogger('kraken.planificador')
+
+# URL de la API REST; se puede apuntar al servidor mock con la variable de entorno KRAKEN_API
+URL_KRAKEN_API = os.environ.get('KRAKEN_API', 'https://api.kraken.com')
+
+# Límites aproximados de la API pública de Kraken: ráfaga corta y ~1 petición por segundo
+CAPACIDAD_RAFAGA = 10
+PETICIONES_POR_SEGUNDO = 1.0
+# Un hilo por conexión del pool compartido
+MAX_HILOS = TAMANO_POOL
+
+# Prioridades: número menor, antes sale de la cola
+PRIORIDAD_ALTA = 0     # lo que un usuario está esperando en pantalla
+PRIORIDAD_NORMAL = 1
+PRIORIDAD_BAJA = 2     # escaneos, backfill y refrescos en segundo plano
+
+
+# Cubo de fichas: cada petición consume una ficha y las fichas se reponen a ritmo constante
+class LimitadorTasa:
+    def __init__(self, capacidad=CAPACIDAD_RAFAGA, ritmo=PETICIONES_POR_SEGUNDO):
+        self.capacidad = capacidad
+        self.ritmo = ritmo
+        self._fichas = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._cerrojo = threading.Lock()
+
+    def _reponer(self):
+        ahora = time.monotonic()
+        self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.ritmo)
+        self._ultimo = ahora
+
+    # Bloquear hasta que haya una ficha disponible
+    def esperar(self):
+        while True:
+            with self._cerrojo:
+                self._reponer()
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.ritmo
+            time.sleep(espera)
+
+
+limitador = LimitadorTasa()
+
+
+# Clave de una petición: método y parámetros, sin importar el orden en que se pasaron
+def clave_peticion(metodo, datos=None):
+    return metodo, tuple(sorted((datos or {}).items()))
+
+
+class Planificador:
+    def __init__(self, limitador=limitador, hilos=MAX_HILOS, crear_api=api_del_hilo, uri=URL_KRAKEN_API):
+        self.limitador = limitador
+        self.uri = uri
+        self.hilos = hilos
+        self.crear_api = crear_api
+        self.peticiones = 0   # llamadas recibidas
+        self.compartidas = 0  # llamadas servidas por una petición ya en vuelo
+        self.enviadas = 0     # peticiones que llegaron a Kraken
+        self._cola = queue.PriorityQueue()
+        self._secuencia = itertools.count()
+        self._en_vuelo = {}
+        self._cerrojo = threading.Lock()
+        self._libres = threading.Semaphore(hilos)
+        self._pool = None
+        self._despachador = None
+
+    def _arrancar(self):
+        # El pool y el despachador se crean la primera vez que hacen falta
+        if self._despachador is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='planificador-kraken')
+            self._despachador = threading.Thread(target=self._despachar, name='planificador-kraken-despachador', daemon=True)
+            self._despachador.start()
+
+    def _encolar(self, prioridad, clave, futuro, metodo, datos, timeout):
+        self._cola.put((prioridad, next(self._secuencia), clave, futuro, metodo, datos, timeout))
+
+    # Encolar una petición pública; si ya hay una idéntica pendiente se devuelve su mismo Future
+    def enviar(self, metodo, datos=None, prioridad=PRIORIDAD_NORMAL, timeout=None):
+        clave = clave_peticion(metodo, datos)
+        with self._cerrojo:
+            self.peticiones += 1
+            pendiente = self._en_vuelo.get(clave)
+            # Un Future cancelado por quien lo pidió no se comparte: se crea otro
+            if pendiente is not None and not pendiente[0].cancelled():
+                self.compartidas += 1
+                futuro, prioridad_actual = pendiente
+                if prioridad < prioridad_actual and not (futuro.running() or futuro.done()):
+                    # Quien llega con más urgencia adelanta la petición compartida;
+                    # la entrada antigua se descarta al salir de la cola
+                    self._en_vuelo[clave] = (futuro, prioridad)
+                    self._encolar(prioridad, clave, futuro, metodo, datos, timeout)
+                return futuro
+            futuro = Future()
+            self._en_vuelo[clave] = (futuro, prioridad)
+            self._arrancar()
+            self._encolar(prioridad, clave, futuro, metodo, datos, timeout)
+        return futuro
+
+    # Atajo bloqueante: devuelve (respuesta JSON, respuesta HTTP)
+    def consultar(self, metodo, datos=None, prioridad=PRIORIDAD_NORMAL, timeout=None):
+        return self.enviar(metodo, datos, prioridad, timeout).result()
+
+    # Si la entrada de la cola sigue pendiente de enviar; las duplicadas por un cambio de prioridad (su
+    # Future ya está en curso o resuelto) no lo están. Un Future cancelado deja de compartirse
+    def _vigente(self, clave, futuro):
+        pendiente = self._en_vuelo.get(clave)
+        if pendiente is None or pendiente[0] is not futuro:
+            return False
+        if futuro.cancelled():
+            del self._en_vuelo[clave]
+        return not (futuro.running() or futuro.done())
+
+    # Bloquear hasta que haya en la cola alguna entrada vigente, sin sacarla
+    def _esperar_peticion(self):
+        while True:
+            entrada = self._cola.get()
+            with self._cerrojo:
+                if self._vigente(entrada[2], entrada[3]):
+                    self._cola.put(entrada)
+                    return
+
+    # Sacar la entrada vigente más urgente y marcar su Future en curso; las que ya no lo son se descartan
+    def _siguiente(self):
+        while True:
+            _, _, clave, futuro, metodo, datos, timeout = self._cola.get()
+            with self._cerrojo:
+                if not self._vigente(clave, futuro):
+                    continue
+                if not futuro.set_running_or_notify_cancel():
+                    # Cancelado por quien lo pidió: otra llamada igual debe crear uno nuevo
+                    del self._en_vuelo[clave]
+                    continue
+            return clave, futuro, metodo, datos, timeout
+
+    def _despachar(self):
+        while True:
+            # Hilo libre, algo que enviar y ficha antes de elegir: así se elige lo más urgente en el
+            # momento de enviar y no se retiene una ficha mientras la cola está vacía
+            self._libres.acquire()
+            try:
+                self._esperar_peticion()
+                self.limitador.esperar()
+                peticion = self._siguiente()
+                self._pool.submit(self._ejecutar, *peticion)
+            except Exception:
+                # El despachador no puede morir: sin él ninguna petición volvería a salir
+                logger.exception("Error en el despachador del planificador")
+                self._libres.release()
+
+    def _ejecutar(self, clave, futuro, metodo, datos, timeout):
+        try:
+            try:
+                api = self.crear_api()
+                api.uri = self.uri
+                resp = api.query_public(metodo, datos, timeout)
+                resultado = (resp, api.response)
+            except Exception as e:
+                resultado = e
+            with self._cerrojo:
+                self.enviadas += 1
+                # Se retira antes de resolver: una llamada posterior ya no comparte esta respuesta
+                if self._en_vuelo.get(clave, (None,))[0] is futuro:
+                    del self._en_vuelo[clave]
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+        finally:
+            self._libres.release()
+
+    def estadisticas(self):
+        with self._cerrojo:
+            return {'peticiones': self.peticiones, 'compartidas': self.compartidas,
+                    'enviadas': self.enviadas, 'en_cola': self._cola.qsize()}
+
+
+# Planificador compartido por todas las sesiones del proceso
+planificador = Planificador()
+
+
+# Sustituto de krakenex.API para consultas públicas: todo pasa por el planificador con la prioridad dada
+class ApiPlanificada:
+    def __init__(self, prioridad=PRIORIDAD_NORMAL, planificador=planificador):
+        self.prioridad = prioridad
+        self.planificador = planificador
+        self.response = None
+
+    def query_public(self, method, data=None, timeout=None):
+        resp, self.response = self.planificador.consultar(method, data, self.prioridad, timeout)
+        return resp
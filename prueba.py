@@ -1,14 +1,15 @@
 import streamlit as st
-import krakenex
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from PIL import Image
+from catalogo_pares import catalogo
+from planificador_kraken import PRIORIDAD_ALTA, ApiPlanificada
 
 #Primera Parte: Lectura y Representación del movimiento del Par de Monedas.
 
 # Configurar la API de Kraken
-api = krakenex.API()
+api = ApiPlanificada(PRIORIDAD_ALTA)
 
 # Título de la aplicación y logo
 image= Image.open('logo_app.png')
@@ -16,8 +17,7 @@ st.image(image, width=200)
 st.title("Visualización del Par de Monedas en Kraken")
 
 # Obtener todos los pares de criptomonedas
-resp_pairs = api.query_public('AssetPairs')
-all_pairs = list(resp_pairs['result'].keys())
+all_pairs = catalogo.nombres()
 
 # Input de usuario: selección de par de monedas
 selected_pair = st.selectbox("Selecciona el par de monedas:", all_pairs)
@@ -0,0 +1,92 @@
+import threading
+
+import numpy as np
+
+from parseo_ohlc import COLUMNAS, solo_lectura
+
+# Intervalos (en minutos) que ofrece Kraken
+INTERVALOS_KRAKEN = [1, 5, 15, 30, 60, 240, 1440, 10080, 21600]
+
+
+# Agregar velas a un intervalo mayor en una sola pasada vectorizada (las velas deben estar ordenadas)
+def remuestrear(columnas, minutos):
+    tiempos = columnas['time']
+    if len(tiempos) == 0:
+        return {nombre: columnas[nombre][:0].copy() for nombre in COLUMNAS}
+    segundos = minutos * 60
+    cubos = tiempos // segundos * segundos
+    primeros = np.concatenate([[0], np.flatnonzero(np.diff(cubos)) + 1])
+    ultimos = np.append(primeros[1:], len(tiempos)) - 1
+    volumen = np.add.reduceat(columnas['volume'], primeros)
+    pv = np.add.reduceat(columnas['vwap'] * columnas['volume'], primeros)
+    cierre = columnas['close'][ultimos]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = np.where(volumen > 0, pv / volumen, cierre)
+    return {
+        'time': cubos[primeros],
+        'open': columnas['open'][primeros],
+        'high': np.maximum.reduceat(columnas['high'], primeros),
+        'low': np.minimum.reduceat(columnas['low'], primeros),
+        'close': cierre,
+        'vwap': vwap,
+        'volume': volumen,
+        'count': np.add.reduceat(columnas['count'], primeros),
+    }
+
+
+# Velas derivadas mínimas para remuestrear sin conexión (cambiar de temporalidad sin descargar)
+VELAS_MINIMAS = 100
+# Velas que Kraken devuelve de cualquier intervalo: al descargar sólo se remuestrea si la base da más
+VELAS_KRAKEN = 720
+
+
+# Elegir la base: el intervalo guardado más fino que divide al pedido, cubre al menos 'velas_minimas'
+# velas del destino y no menos historia que lo que ya hay guardado del propio destino (remuestrear
+# 30 días de velas de 1 h no debe sustituir a 120 días de velas de 4 h); si no hay ninguno se usa el destino.
+# Al descargar se pide velas_minimas=VELAS_KRAKEN: sólo una base con más historia (p. ej. un backfill)
+# gana a descargar el destino directamente
+def intervalo_base(coberturas, destino, velas_minimas=VELAS_MINIMAS):
+    minimo = max(velas_minimas * destino * 60, coberturas.get(destino, 0))
+    candidatos = [intervalo for intervalo, segundos in coberturas.items()
+                  if intervalo < destino and destino % intervalo == 0 and segundos >= minimo]
+    return min(candidatos) if candidatos else destino
+
+
+# Velas derivadas por (par, base, destino) que al llegar velas base nuevas sólo recalculan los cubos afectados
+class CacheTemporalidades:
+    def __init__(self):
+        self._derivadas = {}
+        self._cerrojo = threading.Lock()
+
+    def obtener(self, par, base, destino, columnas_base):
+        if destino == base:
+            return columnas_base
+        clave = (par, base, destino)
+        tiempos = columnas_base['time']
+        with self._cerrojo:
+            anterior = self._derivadas.get(clave)
+        if anterior is None or len(tiempos) == 0 or tiempos[0] != anterior['primer_tiempo'] or len(tiempos) < anterior['n_base']:
+            # Primera vez, o han cambiado velas antiguas (p. ej. un backfill): se recalcula todo
+            derivadas = remuestrear(columnas_base, destino)
+        else:
+            # Sólo puede haber cambiado la cola desde la última vela base ya vista
+            segundos = destino * 60
+            corte_tiempo = anterior['ultimo_tiempo'] // segundos * segundos
+            corte_base = np.searchsorted(tiempos, corte_tiempo, side='left')
+            corte_derivadas = np.searchsorted(anterior['columnas']['time'], corte_tiempo, side='left')
+            cola = remuestrear({nombre: columnas_base[nombre][corte_base:] for nombre in COLUMNAS}, destino)
+            derivadas = {nombre: np.concatenate([anterior['columnas'][nombre][:corte_derivadas], cola[nombre]]) for nombre in COLUMNAS}
+        solo_lectura(derivadas)
+        with self._cerrojo:
+            self._derivadas[clave] = {
+                'columnas': derivadas,
+                'primer_tiempo': tiempos[0] if len(tiempos) else None,
+                # Se guarda la penúltima vela base: la última seguía abierta y puede cambiar
+                'ultimo_tiempo': tiempos[-2] if len(tiempos) > 1 else tiempos[0] if len(tiempos) else None,
+                'n_base': len(tiempos),
+            }
+        return derivadas
+
+
+# Caché compartida por todas las sesiones
+temporalidades = CacheTemporalidades()
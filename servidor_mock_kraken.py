@@ -0,0 +1,168 @@
+import argparse
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from servidor_replay import velas_sinteticas
+
+# Servidor REST local que imita los endpoints públicos de Kraken usados por la aplicación.
+# Sirve respuestas grabadas (directorio con <Metodo>_<par>.json) o sintéticas, con latencia
+# y errores configurables. Para usarlo basta con apuntar krakenex: api.uri = 'http://localhost:8080'.
+
+MAXIMO_VELAS = 720
+MAXIMO_TRADES = 1000
+SEGUNDOS_ENTRE_TRADES = 7
+
+
+def _fila_ohlc(columnas, i):
+    return [int(columnas['time'][i])] + [f"{columnas[nombre][i]:.5f}" for nombre in ('open', 'high', 'low', 'close', 'vwap')] + \
+           [f"{columnas['volume'][i]:.8f}", int(columnas['count'][i])]
+
+
+class EstadoMock:
+    def __init__(self, latencia=0.0, tasa_errores=0.0, grabaciones=None, pares=('XXBTZEUR', 'XETHZEUR'), velas=MAXIMO_VELAS):
+        self.latencia = latencia
+        self.tasa_errores = tasa_errores
+        self.grabaciones = grabaciones
+        self.pares = list(pares)
+        self.velas = velas
+        self.peticiones = 0
+        self._series = {}
+        self._cerrojo = threading.Lock()
+
+    def _grabada(self, metodo, par=None):
+        if not self.grabaciones:
+            return None
+        nombre = f"{metodo}_{par}.json" if par else f"{metodo}.json"
+        ruta = os.path.join(self.grabaciones, nombre)
+        if os.path.exists(ruta):
+            with open(ruta) as f:
+                return json.load(f)
+        return None
+
+    def serie(self, par, intervalo):
+        with self._cerrojo:
+            clave = (par, intervalo)
+            if clave not in self._series:
+                self._series[clave] = velas_sinteticas(n=self.velas, intervalo=intervalo, semilla=len(self._series))
+            return self._series[clave]
+
+    def asset_pairs(self):
+        grabada = self._grabada('AssetPairs')
+        if grabada is not None:
+            return grabada
+        resultado = {}
+        for par in self.pares:
+            base, cotizada = par[:len(par) // 2], par[len(par) // 2:]
+            resultado[par] = {'altname': par, 'wsname': f"{base[-3:]}/{cotizada[-3:]}", 'base': base, 'quote': cotizada}
+        return {'error': [], 'result': resultado}
+
+    def ohlc(self, par, intervalo, since=None):
+        grabada = self._grabada('OHLC', par)
+        if grabada is not None:
+            return grabada
+        if par not in self.pares:
+            return {'error': ['EQuery:Unknown asset pair'], 'result': {}}
+        columnas = self.serie(par, intervalo)
+        n = len(columnas['time'])
+        inicio = max(0, n - MAXIMO_VELAS)
+        if since is not None:
+            inicio = max(inicio, int(np.searchsorted(columnas['time'], int(since))))
+        filas = [_fila_ohlc(columnas, i) for i in range(inicio, n)]
+        last = int(columnas['time'][-2]) if n > 1 else 0
+        return {'error': [], 'result': {par: filas, 'last': last}}
+
+    # Trades sintéticos deterministas: uno cada SEGUNDOS_ENTRE_TRADES desde 'since' (en nanosegundos)
+    def trades(self, par, since=None):
+        grabada = self._grabada('Trades', par)
+        if grabada is not None:
+            return grabada
+        if par not in self.pares:
+            return {'error': ['EQuery:Unknown asset pair'], 'result': {}}
+        ahora = time.time()
+        inicio = int(since) / 1e9 if since else ahora - MAXIMO_TRADES * SEGUNDOS_ENTRE_TRADES
+        primero = int(inicio // SEGUNDOS_ENTRE_TRADES) + 1
+        ultimo = min(primero + MAXIMO_TRADES, int(ahora // SEGUNDOS_ENTRE_TRADES) + 1)
+        filas = []
+        for k in range(primero, ultimo):
+            rng = random.Random(k)
+            precio = 30000 * (1 + 0.05 * np.sin(k / 5000.0)) + rng.uniform(-20, 20)
+            filas.append([f"{precio:.1f}", f"{rng.uniform(0.001, 0.5):.8f}", float(k * SEGUNDOS_ENTRE_TRADES),
+                          rng.choice('bs'), rng.choice('ml'), '', k])
+        last = str(int(filas[-1][2] * 1e9)) if filas else str(since or 0)
+        return {'error': [], 'result': {par: filas, 'last': last}}
+
+
+def crear_manejador(estado):
+    class Manejador(BaseHTTPRequestHandler):
+        # Keep-alive como el servidor real: la conexión queda abierta entre peticiones
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, codigo, cuerpo):
+            datos = json.dumps(cuerpo).encode()
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json')
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                datos = gzip.compress(datos, compresslevel=1)
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self):
+            estado.peticiones += 1
+            if estado.latencia:
+                time.sleep(estado.latencia)
+            url = urlparse(self.path)
+            parametros = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if estado.tasa_errores and random.random() < estado.tasa_errores:
+                if random.random() < 0.5:
+                    return self._responder(500, {'error': ['EService:Unavailable']})
+                return self._responder(200, {'error': ['EAPI:Rate limit exceeded'], 'result': {}})
+
+            if url.path == '/0/public/AssetPairs':
+                return self._responder(200, estado.asset_pairs())
+            if url.path == '/0/public/OHLC':
+                par = parametros.get('pair', '')
+                intervalo = int(parametros.get('interval', 1))
+                return self._responder(200, estado.ohlc(par, intervalo, parametros.get('since')))
+            if url.path == '/0/public/Trades':
+                return self._responder(200, estado.trades(parametros.get('pair', ''), parametros.get('since')))
+            return self._responder(404, {'error': ['EGeneral:Unknown method'], 'result': {}})
+
+    return Manejador
+
+
+# Arrancar el servidor en un hilo; con puerto 0 se elige uno libre. Devuelve (servidor, url)
+def iniciar_en_hilo(estado=None, host='localhost', puerto=0):
+    estado = estado or EstadoMock()
+    servidor = ThreadingHTTPServer((host, puerto), crear_manejador(estado))
+    servidor.estado = estado
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API REST pública de Kraken.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--latencia', type=float, default=0.0, help="segundos de retraso por petición")
+    parser.add_argument('--errores', type=float, default=0.0, help="fracción de peticiones que fallan")
+    parser.add_argument('--grabaciones', default=None, help="directorio con respuestas grabadas")
+    parser.add_argument('--velas', type=int, default=MAXIMO_VELAS, help="velas sintéticas por par")
+    args = parser.parse_args()
+
+    estado = EstadoMock(args.latencia, args.errores, args.grabaciones, velas=args.velas)
+    servidor = ThreadingHTTPServer((args.host, args.puerto), crear_manejador(estado))
+    print(f"Servidor mock de Kraken en http://{args.host}:{args.puerto}")
+    servidor.serve_forever()
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+import websockets
+
+from almacen_ohlc import AlmacenOHLC
+
+# Servidor local que imita el websocket público de Kraken (canal 'ohlc') para probar sin conexión.
+# Genera velas hacia delante a partir de la vela en curso, con un reloj acelerado: cada vela se forma
+# en 'pasos' mensajes y la siguiente empieza en el intervalo siguiente. Así continúan justo detrás de
+# las velas que el cliente ya tiene (el almacén o el servidor mock terminan en la vela anterior a la
+# actual). Si se le da un almacén, el precio arranca en el último cierre guardado del par.
+
+# Velas que se generan de una vez
+VELAS_POR_BLOQUE = 100
+
+
+# Paseo aleatorio de 'n' velas; por defecto termina en la vela anterior a la actual
+def velas_sinteticas(n=2000, intervalo=60, precio=30000.0, semilla=0, inicio=None):
+    rng = np.random.default_rng(semilla)
+    cierres = precio * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    aperturas = np.concatenate([[precio], cierres[:-1]])
+    ruido = np.abs(rng.normal(0, 0.002, n)) * cierres
+    if inicio is None:
+        inicio = (int(time.time()) // (intervalo * 60) - n) * intervalo * 60
+    return {
+        'time': inicio + np.arange(n, dtype=np.int64) * intervalo * 60,
+        'open': aperturas,
+        'high': np.maximum(aperturas, cierres) + ruido,
+        'low': np.minimum(aperturas, cierres) - ruido,
+        'close': cierres,
+        'vwap': (aperturas + cierres) / 2,
+        'volume': np.abs(rng.normal(5, 2, n)),
+        'count': rng.integers(1, 200, n),
+    }
+
+
+# Mensajes de una vela que se va formando en 'pasos' actualizaciones hasta su cierre
+def mensajes_vela(columnas, i, intervalo, pasos, canal, par):
+    inicio = int(columnas['time'][i])
+    apertura, cierre = columnas['open'][i], columnas['close'][i]
+    for paso in range(1, pasos + 1):
+        parcial = apertura + (cierre - apertura) * paso / pasos
+        alto = max(apertura, parcial) if paso < pasos else columnas['high'][i]
+        bajo = min(apertura, parcial) if paso < pasos else columnas['low'][i]
+        datos = [f"{inicio + paso * intervalo * 60 / pasos:.6f}", f"{inicio + intervalo * 60:.6f}",
+                 f"{apertura:.5f}", f"{alto:.5f}", f"{bajo:.5f}", f"{parcial:.5f}",
+                 f"{columnas['vwap'][i]:.5f}", f"{columnas['volume'][i] * paso / pasos:.8f}",
+                 int(columnas['count'][i] * paso / pasos)]
+        yield [canal, datos, f"ohlc-{intervalo}", par]
+
+
+class ServidorReplay:
+    def __init__(self, ritmo=0.2, pasos=3, almacen=None):
+        self.ritmo = ritmo
+        self.pasos = pasos
+        self.almacen = almacen
+        self._canales = 0
+
+    # Clave del almacén para un nombre de websocket ('XBT/EUR'): la del catálogo guardado junto al
+    # almacén si lo hay; si no, las formas habituales de Kraken ('XBTEUR', 'XXBTZEUR')
+    def _claves_almacen(self, par):
+        try:
+            with open(os.path.join(self.almacen.directorio, 'asset_pairs.json')) as f:
+                pares = json.load(f)['pares']
+            claves = [clave for clave, datos in pares.items() if datos.get('wsname') == par]
+        except (OSError, ValueError, KeyError):
+            claves = []
+        base, _, cotizada = par.partition('/')
+        return claves + [f"{base}{cotizada}", f"X{base}Z{cotizada}"]
+
+    # Precio de partida: el último cierre guardado del par, o el del paseo sintético
+    def _precio_inicial(self, par, intervalo):
+        if self.almacen is not None:
+            for clave in self._claves_almacen(par):
+                columnas, _, _ = self.almacen.cargar(clave, intervalo)
+                if columnas is not None and len(columnas['close']):
+                    return float(columnas['close'][-1])
+        return float(velas_sinteticas(intervalo=intervalo, semilla=zlib.crc32(par.encode()) % 1000)['close'][-1])
+
+    async def _reproducir(self, ws, par, intervalo, canal):
+        semilla = zlib.crc32(par.encode()) % 1000
+        precio = self._precio_inicial(par, intervalo)
+        inicio = int(time.time()) // (intervalo * 60) * intervalo * 60
+        while True:
+            columnas = velas_sinteticas(VELAS_POR_BLOQUE, intervalo, precio, semilla, inicio)
+            for i in range(VELAS_POR_BLOQUE):
+                for mensaje in mensajes_vela(columnas, i, intervalo, self.pasos, canal, par):
+                    await ws.send(json.dumps(mensaje))
+                    await asyncio.sleep(self.ritmo)
+            precio = float(columnas['close'][-1])
+            inicio += VELAS_POR_BLOQUE * intervalo * 60
+            semilla += 1
+
+    async def atender(self, ws):
+        await ws.send(json.dumps({'event': 'systemStatus', 'status': 'online', 'version': 'replay'}))
+        tareas = []
+        try:
+            async for mensaje in ws:
+                peticion = json.loads(mensaje)
+                if peticion.get('event') == 'ping':
+                    await ws.send(json.dumps({'event': 'pong', 'reqid': peticion.get('reqid')}))
+                    continue
+                if peticion.get('event') != 'subscribe':
+                    continue
+                suscripcion = peticion.get('subscription', {})
+                intervalo = int(suscripcion.get('interval', 1))
+                for par in peticion.get('pair', []):
+                    self._canales += 1
+                    await ws.send(json.dumps({'event': 'subscriptionStatus', 'channelID': self._canales,
+                                              'channelName': f"ohlc-{intervalo}", 'pair': par,
+                                              'status': 'subscribed', 'subscription': suscripcion}))
+                    tareas.append(asyncio.create_task(self._reproducir(ws, par, intervalo, self._canales)))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+
+    async def servir(self, host='localhost', puerto=8765):
+        async with websockets.serve(self.atender, host, puerto):
+            await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor websocket local que imita el canal OHLC de Kraken.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--ritmo', type=float, default=0.2, help="segundos entre mensajes")
+    parser.add_argument('--pasos', type=int, default=3, help="actualizaciones por vela")
+    parser.add_argument('--datos', default=None, help="directorio del almacén OHLC del que tomar el precio de partida")
+    args = parser.parse_args()
+
+    almacen = AlmacenOHLC(args.datos) if args.datos else None
+    servidor = ServidorReplay(args.ritmo, args.pasos, almacen)
+    print(f"Servidor de reproducción en ws://{args.host}:{args.puerto}")
+    asyncio.run(servidor.servir(args.host, args.puerto))
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import threading
+
+import numpy as np
+import websockets
+
+from bollinger_incremental import BollingerIncremental
+from parseo_ohlc import COLUMNAS, dataframe_ohlc, inicios_tramos
+
+# Websocket público de Kraken; se puede apuntar al servidor de reproducción local
+URL_KRAKEN_WS = os.environ.get('KRAKEN_WS', 'wss://ws.kraken.com')
+
+# Segundos de espera máximos entre reconexiones
+ESPERA_MAXIMA = 30
+
+
+# Convertir un mensaje 'ohlc' del websocket en (inicio de la vela, valores en el orden de COLUMNAS)
+def mensaje_a_vela(datos, intervalo):
+    inicio = int(round(float(datos[1]))) - intervalo * 60
+    valores = [float(x) for x in datos[2:8]]
+    return inicio, valores, int(datos[8])
+
+
+# Velas de un par en memoria que crecen con cada mensaje, con las Bandas de Bollinger al día
+class VelasEnVivo:
+    def __init__(self, columnas=None, ventana=20, num_sd=2, capacidad=1024):
+        n = len(columnas['time']) if columnas is not None else 0
+        capacidad = max(capacidad, 2 * n)
+        self._columnas = {nombre: np.zeros(capacidad, dtype=np.int64 if nombre in ('time', 'count') else np.float64) for nombre in COLUMNAS}
+        if n:
+            for nombre in COLUMNAS:
+                self._columnas[nombre][:n] = columnas[nombre]
+        self.n = n
+        self.version = 0
+        self._cerrojo = threading.Lock()
+        self.bollinger = BollingerIncremental(ventana, num_sd)
+        # La ventana inicial no cruza huecos: sólo velas del último tramo consecutivo
+        ultimo_tramo = inicios_tramos(self._columnas['time'][:n])[-1] if n else 0
+        for i in range(max(ultimo_tramo, n - ventana), n):
+            self.bollinger.agregar(int(self._columnas['time'][i]), self._columnas['close'][i])
+
+    def _crecer(self):
+        for nombre, columna in self._columnas.items():
+            nueva = np.zeros(2 * len(columna), dtype=columna.dtype)
+            nueva[:self.n] = columna[:self.n]
+            self._columnas[nombre] = nueva
+
+    # Añadir la vela o, si es la que sigue abierta, sustituirla
+    def aplicar(self, inicio, valores, count):
+        with self._cerrojo:
+            tiempos = self._columnas['time']
+            if self.n and inicio < tiempos[self.n - 1]:
+                return False
+            if not self.n or inicio > tiempos[self.n - 1]:
+                if self.n == len(tiempos):
+                    self._crecer()
+                self.n += 1
+            i = self.n - 1
+            self._columnas['time'][i] = inicio
+            for nombre, valor in zip(COLUMNAS[1:7], valores):
+                self._columnas[nombre][i] = valor
+            self._columnas['count'][i] = count
+            self.bollinger.agregar(inicio, valores[3])
+            self.version += 1
+            return True
+
+    # Copia de las velas actuales como DataFrame tipado
+    def dataframe(self):
+        with self._cerrojo:
+            return dataframe_ohlc({nombre: columna[:self.n].copy() for nombre, columna in self._columnas.items()})
+
+    def estado(self):
+        with self._cerrojo:
+            return self.bollinger.estado()
+
+
+# Suscripción a las velas OHLC de Kraken por websocket en un hilo propio con reconexión automática
+class FlujoOHLC:
+    def __init__(self, url=URL_KRAKEN_WS, intervalo=60):
+        self.url = url
+        self.intervalo = intervalo
+        self.velas = {}
+        self.conectado = False
+        self.ultimo_error = None
+        self._ws = None
+        self._bucle = None
+        self._hilo = None
+        self._parar = threading.Event()
+
+    def _mensaje_suscripcion(self, pares):
+        return json.dumps({'event': 'subscribe', 'pair': list(pares), 'subscription': {'name': 'ohlc', 'interval': self.intervalo}})
+
+    # Empezar a recibir un par (nombre 'wsname', p. ej. 'XBT/EUR') sobre unas velas ya cargadas
+    def suscribir(self, par_ws, velas):
+        if par_ws in self.velas:
+            return self.velas[par_ws]
+        self.velas[par_ws] = velas
+        if self._ws is not None and self._bucle is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.send(self._mensaje_suscripcion([par_ws])), self._bucle)
+        self.iniciar()
+        return velas
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=lambda: asyncio.run(self._ejecutar()), daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        if self._ws is not None and self._bucle is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._bucle)
+
+    def _procesar(self, mensaje):
+        datos = json.loads(mensaje)
+        if isinstance(datos, dict):
+            if datos.get('event') == 'subscriptionStatus' and datos.get('status') == 'error':
+                self.ultimo_error = datos.get('errorMessage')
+            return
+        # [channelID, [time, etime, open, high, low, close, vwap, volume, count], 'ohlc-60', 'XBT/EUR']
+        velas = self.velas.get(datos[-1])
+        if velas is not None and str(datos[-2]).startswith('ohlc'):
+            velas.aplicar(*mensaje_a_vela(datos[1], self.intervalo))
+
+    async def _ejecutar(self):
+        self._bucle = asyncio.get_running_loop()
+        espera = 1
+        while not self._parar.is_set():
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self._ws = ws
+                    self.conectado = True
+                    espera = 1
+                    if self.velas:
+                        await ws.send(self._mensaje_suscripcion(self.velas))
+                    async for mensaje in ws:
+                        self._procesar(mensaje)
+            except Exception as e:
+                self.ultimo_error = e
+            finally:
+                self._ws = None
+                self.conectado = False
+            if not self._parar.is_set():
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA)
+
+
+# Un flujo por intervalo, compartido por todas las sesiones; no se conecta hasta la primera suscripción
+flujos = {}
+_cerrojo_flujos = threading.Lock()
+
+
+def obtener_flujo(intervalo=60):
+    with _cerrojo_flujos:
+        if intervalo not in flujos:
+            flujos[intervalo] = FlujoOHLC(intervalo=intervalo)
+        return flujos[intervalo]
+
+
+flujo = obtener_flujo(60)
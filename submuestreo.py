@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Ancho aproximado del gráfico en píxeles y puntos que merece la pena enviar por píxel
+ANCHO_PIXELES = 1000
+PUNTOS_POR_PIXEL = 2
+PUNTOS_MAXIMOS = ANCHO_PIXELES * PUNTOS_POR_PIXEL
+
+# Puntos a partir de los cuales LTTB (un bucle por punto) se sustituye por mínimo y máximo de cada cubo.
+# Coincide con trazas.UMBRAL_WEBGL: con tantos puntos cada píxel recibe varios y los extremos bastan
+UMBRAL_LTTB = 10_000
+
+
+def _eje_numerico(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+# Índices del mínimo y el máximo de cada cubo (más el primer y el último punto), sin bucles de Python
+def indices_min_max(y, puntos):
+    n = len(y)
+    if puntos >= n or puntos < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    inicios = np.linspace(0, n, (puntos - 2) // 2, endpoint=False).astype(np.int64)
+    cubo = np.repeat(np.arange(len(inicios)), np.diff(np.append(inicios, n)))
+    extremos = []
+    for reduccion in (np.maximum, np.minimum):
+        # Primera posición de cada cubo que alcanza su extremo
+        candidatos = np.flatnonzero(y == reduccion.reduceat(y, inicios)[cubo])
+        extremos.append(candidatos[np.diff(cubo[candidatos], prepend=-1) != 0])
+    return np.unique(np.concatenate([[0, n - 1], *extremos]))
+
+
+# Largest-Triangle-Three-Buckets: índices de los puntos que conservan la forma de la línea.
+# Por encima de UMBRAL_LTTB se usan mínimo y máximo por cubo (indices_min_max)
+def indices_lttb(x, y, puntos, umbral=UMBRAL_LTTB):
+    n = len(y)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+    if puntos > umbral:
+        return indices_min_max(y, puntos)
+    x = _eje_numerico(x)
+    y = np.asarray(y, dtype=np.float64)
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+    elegidos = np.empty(puntos, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    a = 0
+    for i in range(puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # Punto medio del cubo siguiente como tercer vértice del triángulo
+        siguiente_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        cx = x[fin:siguiente_fin].mean() if siguiente_fin > fin else x[-1]
+        cy = y[fin:siguiente_fin].mean() if siguiente_fin > fin else y[-1]
+        areas = np.abs((x[a] - cx) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (cy - y[a]))
+        a = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = a
+    return elegidos
+
+
+# Reducir un DataFrame de líneas: unión de los índices LTTB de cada columna (los NaN iniciales se respetan).
+# Con puntos=None se devuelve el marco completo
+def reducir_lineas(df, columnas, puntos=PUNTOS_MAXIMOS):
+    if puntos is None or len(df) <= puntos:
+        return df
+    indices = []
+    for columna in columnas:
+        validos = np.flatnonzero(df[columna].notna().to_numpy())
+        if len(validos) == 0:
+            continue
+        sub = indices_lttb(df['time'].to_numpy()[validos], df[columna].to_numpy()[validos], puntos // len(columnas))
+        indices.append(validos[sub])
+        # Máximo y mínimo absolutos siempre visibles
+        valores = df[columna].to_numpy()[validos]
+        indices.append(validos[[np.argmax(valores), np.argmin(valores)]])
+        if validos[0] > 0:
+            indices.append(np.array([0, validos[0] - 1]))
+    if not indices:
+        return df.iloc[[0, len(df) - 1]]
+    return df.iloc[np.unique(np.concatenate(indices))]
+
+
+# Reducir velas por cubos: apertura primera, cierre última, máximo y mínimo del cubo
+def reducir_velas(df, puntos=PUNTOS_MAXIMOS // PUNTOS_POR_PIXEL):
+    n = len(df)
+    if puntos is None or n <= puntos:
+        return df
+    inicios = np.linspace(0, n, puntos, endpoint=False).astype(np.int64)
+    finales = np.append(inicios[1:], n) - 1
+    return pd.DataFrame({
+        'time': df['time'].to_numpy()[inicios],
+        'open': df['open'].to_numpy()[inicios],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), inicios),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), inicios),
+        'close': df['close'].to_numpy()[finales],
+    }, index=df.index[inicios])
@@ -0,0 +1,37 @@
+import numpy as np
+
+from almacen_ohlc import AlmacenOHLC, fusionar_columnas
+from parseo_ohlc import COLUMNAS, inicios_tramos
+
+
+def velas(inicio, n, intervalo=60):
+    tiempos = np.arange(inicio, inicio + n * intervalo * 60, intervalo * 60, dtype=np.int64)
+    columnas = {nombre: np.arange(n, dtype=np.float64) + inicio for nombre in COLUMNAS}
+    columnas['time'] = tiempos
+    columnas['count'] = np.ones(n, dtype=np.int64)
+    return columnas
+
+
+def test_fusionar_sustituye_la_ultima_vela_y_anade_las_nuevas():
+    guardadas = velas(0, 10)
+    nuevas = velas(9 * 3600, 5)
+    fusion = fusionar_columnas(guardadas, nuevas, 60)
+    assert len(fusion['time']) == 14
+    assert np.all(np.diff(fusion['time']) == 3600)
+    assert fusion['close'][9] == nuevas['close'][0]
+
+
+def test_fusionar_con_hueco_conserva_lo_guardado_y_marca_el_hueco():
+    guardadas = velas(0, 10)
+    nuevas = velas(100 * 3600, 5)
+    fusion = fusionar_columnas(guardadas, nuevas, 60)
+    assert len(fusion['time']) == 15
+    np.testing.assert_array_equal(fusion['time'][:10], guardadas['time'])
+    np.testing.assert_array_equal(inicios_tramos(fusion['time'], 60), [0, 10])
+    np.testing.assert_array_equal(inicios_tramos(fusion['time']), [0, 10])
+
+
+def test_huecos_del_almacen(tmp_path):
+    almacen = AlmacenOHLC(str(tmp_path))
+    almacen.guardar('P', 60, fusionar_columnas(velas(0, 10), velas(100 * 3600, 5), 60), 0)
+    assert almacen.huecos('P', 60) == [(9 * 3600, 100 * 3600)]
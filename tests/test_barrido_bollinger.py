@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from barrido_bollinger import barrido_bollinger
+from indicadores import calcular_bandas_bollinger, calcular_senales
+
+VENTANAS = [10, 20, 200]
+NUM_SDS = [1.5, 2, 2.5]
+
+
+# Un año de velas de 1 minuto que suben de 25.000 a 65.000: la suma de cuadrados global pierde precisión
+def cierres_de_un_anyo(n=525_600):
+    rng = np.random.default_rng(1)
+    tendencia = np.exp(np.linspace(np.log(25_000), np.log(65_000), n))
+    return np.round(tendencia * np.exp(np.cumsum(rng.normal(0, 5e-4, n))), 1)
+
+
+def test_coincide_con_el_calculo_exacto_de_cada_ventana():
+    cierres = cierres_de_un_anyo()
+    resultado = barrido_bollinger(cierres, VENTANAS, NUM_SDS)
+    for i, ventana in enumerate(VENTANAS):
+        ventanas = sliding_window_view(cierres, ventana)
+        np.testing.assert_allclose(resultado.media[i, ventana - 1:], ventanas.mean(axis=1), rtol=1e-12)
+        np.testing.assert_allclose(resultado.desviacion[i, ventana - 1:], ventanas.std(axis=1, ddof=1), rtol=1e-8)
+        assert np.isnan(resultado.media[i, :ventana - 1]).all()
+
+
+def test_las_senales_coinciden_con_calcular_senales():
+    cierres = cierres_de_un_anyo()
+    df = pd.DataFrame({'time': np.arange(len(cierres), dtype=np.int64) * 60, 'close': cierres})
+    cubo = barrido_bollinger(df, VENTANAS, NUM_SDS).senales()
+    for i, ventana in enumerate(VENTANAS):
+        for j, num_sd in enumerate(NUM_SDS):
+            esperadas = calcular_senales(calcular_bandas_bollinger(df, ventana, num_sd))['signal'].to_numpy()
+            np.testing.assert_array_equal(cubo[i, j, ventana - 1:], esperadas)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bollinger_incremental import BollingerIncremental
+from servidor_replay import velas_sinteticas
+
+VENTANA = 20
+
+
+def referencia_exacta(cierres):
+    ventanas = sliding_window_view(cierres, VENTANA)
+    media = np.full(len(cierres), np.nan)
+    desviacion = np.full(len(cierres), np.nan)
+    media[VENTANA - 1:] = ventanas.mean(axis=1)
+    desviacion[VENTANA - 1:] = ventanas.std(axis=1, ddof=1)
+    return media, desviacion
+
+
+def estados(bollinger, tiempos, cierres, parciales=0):
+    medias, desviaciones, senales = [], [], []
+    for tiempo, cierre in zip(tiempos, cierres):
+        # La vela abierta llega antes varias veces con cierres provisionales
+        for paso in range(parciales):
+            bollinger.agregar(int(tiempo), cierre * (1 + 0.01 * (paso + 1)))
+        estado = bollinger.agregar(int(tiempo), cierre)
+        medias.append(estado['media_móvil'])
+        desviaciones.append(estado['desviación_estándar'])
+        senales.append(estado['signal'])
+    return np.array(medias), np.array(desviaciones), np.array(senales)
+
+
+def test_coincide_con_el_calculo_exacto_de_cada_ventana():
+    columnas = velas_sinteticas(n=30_000)
+    media, desviacion, _ = estados(BollingerIncremental(VENTANA, 2), columnas['time'], columnas['close'])
+    media_exacta, desviacion_exacta = referencia_exacta(columnas['close'])
+    np.testing.assert_allclose(media, media_exacta, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(desviacion, desviacion_exacta, rtol=1e-9, equal_nan=True)
+
+
+def test_actualizar_la_vela_abierta_equivale_a_recibirla_cerrada():
+    columnas = velas_sinteticas(n=3000)
+    media, desviacion, senales = estados(BollingerIncremental(VENTANA, 2), columnas['time'], columnas['close'], parciales=3)
+    ventana_movil = pd.Series(columnas['close']).rolling(VENTANA)
+    np.testing.assert_allclose(media, ventana_movil.mean().to_numpy(), rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(desviacion, ventana_movil.std().to_numpy(), rtol=1e-9, equal_nan=True)
+    cierres = columnas['close']
+    superior = media + 2 * desviacion
+    inferior = media - 2 * desviacion
+    esperadas = np.where(cierres < inferior, 1, np.where(cierres > superior, -1, 0))
+    np.testing.assert_array_equal(senales, esperadas)
@@ -0,0 +1,24 @@
+import pandas as pd
+import plotly.graph_objects as go
+
+from cache_figuras import cache, memorizar_figura
+
+
+class AppIngles:
+    @memorizar_figura
+    def graficar_datos(self, df, par_seleccionado):
+        return go.Figure(layout=dict(title='Price'))
+
+
+class AppEspanol:
+    @memorizar_figura
+    def graficar_datos(self, df, par_seleccionado):
+        return go.Figure(layout=dict(title='Precio'))
+
+
+def test_metodos_con_el_mismo_nombre_no_comparten_figura():
+    cache.vaciar()
+    df = pd.DataFrame({'time': pd.to_datetime([0, 1], unit='s'), 'close': [1.0, 2.0]})
+    assert AppIngles().graficar_datos(df, 'XXBTZEUR').layout.title.text == 'Price'
+    assert AppEspanol().graficar_datos(df, 'XXBTZEUR').layout.title.text == 'Precio'
+    assert AppIngles().graficar_datos(df, 'XXBTZEUR').layout.title.text == 'Price'
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import indicadores
+from almacen_ohlc import AlmacenOHLC
+from cache_indicadores import CacheIndicadores
+from parseo_ohlc import dataframe_ohlc
+from servidor_replay import velas_sinteticas
+
+N = 5000
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheIndicadores(AlmacenOHLC(str(tmp_path)))
+
+
+@pytest.fixture
+def columnas():
+    return velas_sinteticas(n=N)
+
+
+def tramo(columnas, inicio=0, fin=None):
+    return dataframe_ohlc({nombre: columna[inicio:fin].copy() for nombre, columna in columnas.items()})
+
+
+# El resultado de la caché debe coincidir con un cálculo completo desde cero
+def comprobar(df_cache, df):
+    referencia = indicadores.calcular_bandas_bollinger(df)
+    for nombre in ['media_móvil', 'desviación_estándar', 'banda_superior', 'banda_inferior']:
+        np.testing.assert_allclose(df_cache[nombre].to_numpy(), referencia[nombre].to_numpy(), rtol=1e-9, equal_nan=True)
+    senales = indicadores.calcular_senales(referencia)
+    np.testing.assert_array_equal(df_cache.loc[senales.index, 'signal'].to_numpy(), senales['signal'].to_numpy())
+    assert (df_cache['signal'].to_numpy()[:19] == 0).all()
+
+
+def test_sin_cambios_no_recalcula(cache, columnas):
+    df = tramo(columnas)
+    cache.bandas('P', 60, df)
+    assert cache.ultimas_recalculadas == N
+    comprobar(cache.bandas('P', 60, df), df)
+    assert cache.ultimas_recalculadas == 0
+
+
+def test_velas_nuevas_recalculan_solo_la_cola(cache, columnas):
+    cache.bandas('P', 60, tramo(columnas, fin=N - 300))
+    df = tramo(columnas)
+    comprobar(cache.bandas('P', 60, df), df)
+    assert cache.ultimas_recalculadas == 300
+
+
+def test_vela_abierta_que_cambia_se_recalcula(cache, columnas):
+    cache.bandas('P', 60, tramo(columnas))
+    abierta = {nombre: columna.copy() for nombre, columna in columnas.items()}
+    abierta['close'][-1] *= 1.05
+    df = tramo(abierta)
+    comprobar(cache.bandas('P', 60, df), df)
+    assert cache.ultimas_recalculadas == 1
+
+
+def test_prefijo_distinto_recalcula_todo(cache, columnas):
+    cache.bandas('P', 60, tramo(columnas, inicio=100))
+    df = tramo(columnas)
+    comprobar(cache.bandas('P', 60, df), df)
+    assert cache.ultimas_recalculadas == N
+
+
+def test_parametros_distintos_no_comparten_fichero(cache, columnas):
+    df = tramo(columnas)
+    cache.bandas('P', 60, df, ventana=20, num_sd=2)
+    cache.bandas('P', 60, df, ventana=20, num_sd=2.5)
+    assert cache.ultimas_recalculadas == N
+    assert cache.ruta('P', 60, 20, 2) != cache.ruta('P', 60, 20, 2.5)
+
+
+def test_las_ventanas_no_cruzan_huecos(cache, columnas):
+    # Un histórico antiguo y las velas recientes separadas por un hueco de 30 días
+    con_hueco = {nombre: columna.copy() for nombre, columna in columnas.items()}
+    con_hueco['time'][N // 2:] += 30 * 24 * 3600
+    df = tramo(con_hueco)
+    bandas = cache.bandas('P', 60, df)
+    for mitad in [slice(0, N // 2), slice(N // 2, N)]:
+        referencia = indicadores.calcular_bandas_bollinger(tramo(columnas, mitad.start, mitad.stop))
+        np.testing.assert_allclose(bandas['banda_superior'].to_numpy()[mitad], referencia['banda_superior'].to_numpy(),
+                                   rtol=1e-9, equal_nan=True)
+    assert np.isnan(bandas['media_móvil'].to_numpy()[N // 2:N // 2 + 19]).all()
+    # Velas nuevas después del hueco: sólo se recalcula la cola y sigue separada
+    cache.bandas('P', 60, tramo(con_hueco, fin=N - 10))
+    np.testing.assert_allclose(cache.bandas('P', 60, df)['banda_superior'].to_numpy(), bandas['banda_superior'].to_numpy(),
+                               rtol=1e-9, equal_nan=True)
@@ -0,0 +1,16 @@
+from cliente_kraken import bytes_recibidos, crear_sesion
+from servidor_mock_kraken import EstadoMock, iniciar_en_hilo
+
+
+def test_bytes_recibidos_son_los_de_la_red_y_se_cuentan_una_vez():
+    servidor, url = iniciar_en_hilo(EstadoMock())
+    try:
+        sesion, _ = crear_sesion()
+        respuesta = sesion.get(f"{url}/0/public/OHLC", params={'pair': 'XXBTZEUR', 'interval': 60})
+        assert respuesta.headers['Content-Encoding'] == 'gzip'
+        recibidos = bytes_recibidos(respuesta)
+        assert recibidos == int(respuesta.headers['Content-Length']) < len(respuesta.content)
+        # Otra sesión que comparte la misma respuesta no la vuelve a contar
+        assert bytes_recibidos(respuesta) == 0
+    finally:
+        servidor.shutdown()
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+import motor_indicadores
+from motor_indicadores import Contexto, calcular
+from parseo_ohlc import dataframe_ohlc
+from servidor_replay import velas_sinteticas
+
+
+def precios(n=5000, **kwargs):
+    return dataframe_ohlc(velas_sinteticas(n=n, **kwargs))
+
+
+def rango_verdadero(df):
+    anterior = df['close'].shift()
+    return pd.concat([df['high'] - df['low'], (df['high'] - anterior).abs(), (df['low'] - anterior).abs()], axis=1).max(axis=1)
+
+
+def iguales(obtenido, esperado):
+    np.testing.assert_allclose(obtenido, np.asarray(esperado, dtype=np.float64), rtol=1e-10, atol=1e-9, equal_nan=True)
+
+
+def test_bollinger_y_porcentaje_b():
+    df = precios()
+    resultado = calcular(df, ['bollinger', 'porcentaje_b'])
+    media, desviacion = df['close'].rolling(20).mean(), df['close'].rolling(20).std()
+    iguales(resultado['media_móvil'], media)
+    iguales(resultado['desviación_estándar'], desviacion)
+    iguales(resultado['banda_superior'], media + 2 * desviacion)
+    iguales(resultado['banda_inferior'], media - 2 * desviacion)
+    iguales(resultado['porcentaje_b'], (df['close'] - (media - 2 * desviacion)) / (4 * desviacion))
+
+
+def test_rsi():
+    df = precios()
+    cambio = df['close'].diff()
+    subidas = cambio.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    bajadas = (-cambio).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    esperado = 100 - 100 / (1 + subidas / bajadas)
+    esperado[:14] = np.nan
+    iguales(calcular(df, ['rsi'])['rsi'], esperado)
+
+
+def test_macd():
+    df = precios()
+    macd = df['close'].ewm(span=12, adjust=False).mean() - df['close'].ewm(span=26, adjust=False).mean()
+    senal = macd.ewm(span=9, adjust=False).mean()
+    resultado = calcular(df, ['macd'])
+    iguales(resultado['macd'], macd)
+    iguales(resultado['macd_señal'], senal)
+    iguales(resultado['macd_histograma'], macd - senal)
+
+
+def test_atr_y_keltner():
+    df = precios()
+    resultado = calcular(df, ['atr', 'keltner'])
+    iguales(resultado['atr'], rango_verdadero(df).ewm(alpha=1 / 14, adjust=False).mean())
+    media = df['close'].ewm(span=20, adjust=False).mean()
+    atr = rango_verdadero(df).ewm(alpha=1 / 10, adjust=False).mean()
+    iguales(resultado['keltner_media'], media)
+    iguales(resultado['keltner_superior'], media + 2 * atr)
+    iguales(resultado['keltner_inferior'], media - 2 * atr)
+
+
+def calculados(df, indicadores):
+    contexto = Contexto(df)
+    calcular(df, indicadores, contexto)
+    return contexto.calculados
+
+
+def test_los_intermedios_compartidos_se_calculan_una_vez():
+    df = precios()
+    # %B reutiliza los momentos de 'bollinger' y el ATR de 14 velas el de Keltner con ventana_atr=14
+    assert calculados(df, ['bollinger', 'porcentaje_b']) == calculados(df, ['bollinger'])
+    assert calculados(df, {'keltner': {'ventana_atr': 14}, 'atr': {}}) == calculados(df, {'keltner': {'ventana_atr': 14}})
+    todos = list(motor_indicadores.INDICADORES)
+    assert calculados(df, todos) < sum(calculados(df, [nombre]) for nombre in todos)
+
+
+def test_despues_de_un_hueco_cada_tramo_se_calcula_por_separado():
+    antes = velas_sinteticas(n=300, inicio=0)
+    despues = velas_sinteticas(n=200, semilla=1, inicio=int(antes['time'][-1]) + 50 * 3600)
+    df = dataframe_ohlc({nombre: np.concatenate([antes[nombre], despues[nombre]]) for nombre in antes})
+    todos = list(motor_indicadores.INDICADORES)
+    resultado = calcular(df, todos)
+    por_tramos = [calcular(dataframe_ohlc(columnas), todos) for columnas in (antes, despues)]
+    for columna, valores in resultado.items():
+        iguales(valores, np.concatenate([tramo[columna] for tramo in por_tramos]))
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from planificador_kraken import PRIORIDAD_ALTA, PRIORIDAD_BAJA, PRIORIDAD_NORMAL, LimitadorTasa, Planificador
+
+
+# API falsa: apunta el orden de las peticiones y puede retenerlas hasta que se suelte 'puerta'
+class ApiFalsa:
+    def __init__(self):
+        self.uri = None
+        self.response = None
+        self.enviadas = []
+        self.puerta = threading.Event()
+        self.puerta.set()
+        self._cerrojo = threading.Lock()
+
+    def query_public(self, metodo, datos=None, timeout=None):
+        with self._cerrojo:
+            self.enviadas.append(metodo)
+        self.puerta.wait(5)
+        return {'result': metodo}
+
+
+def crear_planificador(api, hilos=2, capacidad=100, ritmo=1000.0):
+    return Planificador(LimitadorTasa(capacidad, ritmo), hilos=hilos, crear_api=lambda: api, uri='http://mock')
+
+
+def test_peticiones_iguales_se_comparten():
+    api = ApiFalsa()
+    api.puerta.clear()
+    planificador = crear_planificador(api)
+    futuros = [planificador.enviar('OHLC', {'pair': 'XXBTZEUR', 'interval': 60}) for _ in range(20)]
+    api.puerta.set()
+    assert {futuro.result(5)[0]['result'] for futuro in futuros} == {'OHLC'}
+    assert api.enviadas == ['OHLC']
+    assert planificador.estadisticas()['compartidas'] == 19
+
+
+def test_subir_prioridad_no_rompe_el_despachador():
+    api = ApiFalsa()
+    api.puerta.clear()
+    planificador = crear_planificador(api, hilos=1)
+    # Ocupa el único hilo para que lo siguiente quede en la cola
+    bloqueo = planificador.enviar('Bloqueo')
+    while not api.enviadas:
+        time.sleep(0.01)
+    baja = planificador.enviar('OHLC', {'pair': 'X'}, PRIORIDAD_BAJA)
+    otra = planificador.enviar('Ticker', None, PRIORIDAD_NORMAL)
+    alta = planificador.enviar('OHLC', {'pair': 'X'}, PRIORIDAD_ALTA)
+    assert alta is baja
+    api.puerta.set()
+    for futuro in [bloqueo, alta, otra]:
+        futuro.result(5)
+    # La entrada antigua de la petición adelantada se descarta sin volver a enviarse
+    assert api.enviadas == ['Bloqueo', 'OHLC', 'Ticker']
+    assert planificador.enviar('Despues').result(5)[0]['result'] == 'Despues'
+    assert planificador._despachador.is_alive()
+
+
+def test_prioridad_alta_adelanta_a_la_cola_con_el_cubo_vacio():
+    api = ApiFalsa()
+    # Una ficha de golpe y después una cada 50 ms: los hilos libres no bastan para adelantarse
+    planificador = crear_planificador(api, hilos=4, capacidad=1, ritmo=20.0)
+    bajas = [planificador.enviar(f'Escaneo{i}', None, PRIORIDAD_BAJA) for i in range(4)]
+    # El usuario llega cuando los escaneos ya esperan ficha
+    time.sleep(0.02)
+    alta = planificador.enviar('Usuario', None, PRIORIDAD_ALTA)
+    alta.result(5)
+    for futuro in bajas:
+        futuro.result(5)
+    assert api.enviadas.index('Usuario') <= 1
+
+
+def test_en_reposo_no_se_guarda_una_ficha_de_mas():
+    api = ApiFalsa()
+    planificador = crear_planificador(api, hilos=4, capacidad=2, ritmo=5.0)
+    planificador.enviar('Primera').result(5)
+    # Reposo: el cubo vuelve a llenarse (2 fichas, una cada 200 ms)
+    time.sleep(0.5)
+    futuros = [planificador.enviar(f'Rafaga{i}') for i in range(4)]
+    time.sleep(0.1)
+    # Sólo sale de golpe lo que cabe en el cubo
+    assert len(api.enviadas) == 1 + 2
+    for futuro in futuros:
+        futuro.result(5)
+
+
+def test_una_peticion_cancelada_no_se_comparte():
+    api = ApiFalsa()
+    api.puerta.clear()
+    planificador = crear_planificador(api, hilos=1)
+    bloqueo = planificador.enviar('Bloqueo')
+    while not api.enviadas:
+        time.sleep(0.01)
+    cancelada = planificador.enviar('Ticker')
+    assert cancelada.cancel()
+    nueva = planificador.enviar('Ticker')
+    assert nueva is not cancelada
+    api.puerta.set()
+    bloqueo.result(5)
+    assert nueva.result(5)[0]['result'] == 'Ticker'
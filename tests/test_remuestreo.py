@@ -0,0 +1,30 @@
+from remuestreo import VELAS_KRAKEN, intervalo_base
+
+HORA = 3600
+DIA = 24 * HORA
+
+
+def test_sin_el_destino_guardado_se_remuestrea_desde_la_base_mas_fina():
+    assert intervalo_base({5: 30 * DIA, 60: 30 * DIA}, 240) == 5
+
+
+def test_base_corta_no_sustituye_al_destino_con_mas_historia():
+    # 720 velas de 1 h (30 días) frente a 720 velas de 4 h (120 días)
+    assert intervalo_base({60: 719 * HORA, 240: 719 * 4 * HORA}, 240) == 240
+
+
+def test_base_con_mas_historia_que_el_destino_se_usa():
+    # Velas de 1 h completadas con un backfill que ya cubren más que las de 4 h
+    assert intervalo_base({60: 200 * DIA, 240: 719 * 4 * HORA}, 240) == 60
+
+
+def test_base_con_pocas_velas_del_destino_no_se_usa():
+    assert intervalo_base({60: 50 * 4 * HORA}, 240) == 240
+
+
+def test_al_descargar_solo_gana_una_base_con_mas_velas_que_kraken():
+    # Sin el destino guardado: 720 velas de 1 h dan 180 de 4 h, menos que las 720 que sirve Kraken
+    assert intervalo_base({60: 719 * HORA}, 240) == 60
+    assert intervalo_base({60: 719 * HORA}, 240, VELAS_KRAKEN) == 240
+    assert intervalo_base({5: 719 * 5 * 60}, 15, VELAS_KRAKEN) == 15
+    assert intervalo_base({60: 400 * DIA}, 240, VELAS_KRAKEN) == 60
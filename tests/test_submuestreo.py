@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from submuestreo import UMBRAL_LTTB, indices_lttb, indices_min_max, reducir_lineas
+
+
+def serie(n, semilla=0):
+    return np.cumsum(np.random.default_rng(semilla).normal(size=n))
+
+
+def test_min_max_conserva_los_extremos_de_cada_cubo():
+    y = serie(100_003)
+    indices = indices_min_max(y, 1000)
+    assert len(indices) <= 1000
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert np.all(np.diff(indices) > 0)
+    inicios = np.linspace(0, len(y), 499, endpoint=False).astype(np.int64)
+    for a, b in zip(inicios, np.append(inicios[1:], len(y))):
+        elegidos = y[indices[(indices >= a) & (indices < b)]]
+        assert elegidos.max() == y[a:b].max() and elegidos.min() == y[a:b].min()
+
+
+def test_lttb_por_debajo_del_umbral_y_min_max_por_encima():
+    y = serie(50_000)
+    x = np.arange(len(y))
+    lttb = indices_lttb(x, y, UMBRAL_LTTB)
+    assert len(lttb) == UMBRAL_LTTB
+    np.testing.assert_array_equal(indices_lttb(x, y, UMBRAL_LTTB + 2), indices_min_max(y, UMBRAL_LTTB + 2))
+
+
+def test_reducir_lineas_con_mucho_presupuesto_respeta_el_calentamiento():
+    n = 300_000
+    df = pd.DataFrame({'time': pd.date_range('2020-01-01', periods=n, freq='min'), 'close': serie(n)})
+    df['media_móvil'] = df['close'].rolling(20).mean()
+    reducido = reducir_lineas(df, ['close', 'media_móvil'], puntos=60_000)
+    assert len(reducido) <= 60_000 + 6
+    assert reducido['close'].max() == df['close'].max() and reducido['close'].min() == df['close'].min()
+    assert reducido.index[0] == 0 and 18 in reducido.index and 19 in reducido.index
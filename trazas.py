@@ -0,0 +1,14 @@
+import plotly.graph_objects as go
+
+# Puntos totales de una figura (sumando todas sus trazas) a partir de los cuales se dibuja con WebGL.
+# Por debajo el SVG de go.Scatter es más nítido; por encima el navegador se atasca al mover y hacer zoom
+UMBRAL_WEBGL = 10_000
+
+
+# Clase de traza para una figura con 'puntos' puntos: go.Scattergl admite los mismos estilos de línea
+# (dash='dot'), marcadores ('triangle-up') y hover que go.Scatter
+def clase_scatter(puntos, umbral=UMBRAL_WEBGL):
+    return go.Scattergl if puntos > umbral else go.Scatter
+
+# go.Candlestick no tiene versión WebGL: las velas se siguen reduciendo aunque se pidan todos los puntos
+PUNTOS_MAXIMOS_VELAS = 10_000